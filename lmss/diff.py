@@ -11,6 +11,7 @@ import argparse
 import csv
 import json
 import sys
+from typing import Iterable, Iterator
 
 # packages
 import rdflib
@@ -20,21 +21,32 @@ import rdflib
 import lmss.owl
 from lmss.graph import LMSSGraph
 
-
-def diff_graphs(
-    graph1: LMSSGraph, graph2: LMSSGraph, output_format: str = "csv"
-) -> None:
-    """Diff two graphs and print the results as either plain text, CSV, or JSON records.
+# concept fields compared by diff_graphs; derived search fields are skipped
+CONCEPT_FIELDS = (
+    "label",
+    "pref_labels",
+    "alt_labels",
+    "hidden_labels",
+    "definitions",
+    "top_concept",
+    "parents",
+    "children",
+)
+CONCEPT_LIST_FIELDS = frozenset(
+    ("pref_labels", "alt_labels", "hidden_labels", "definitions", "parents", "children")
+)
+
+
+def iter_graph_diffs(graph1: LMSSGraph, graph2: LMSSGraph) -> Iterator[dict]:
+    """Yield the concept-level differences between two graphs one record at a time.
 
     Args:
         graph1 (LMSSGraph): The first graph.
-        graph1 (LMSSGraph): The second graph.
-        output_format (str): The output format. One of "csv", "json", or "text".
-    """
-
-    # store diff findings
-    diff_list = []
+        graph2 (LMSSGraph): The second graph.
 
+    Yields:
+        dict: A diff record with iri, field, g1, g2, and diff_type keys.
+    """
     # get the IRIs on each branch
     g1_iris = set(graph1.concepts.keys())
     g2_iris = set(graph2.concepts.keys())
@@ -44,72 +56,77 @@ def diff_graphs(
     g2_only_iris = g2_iris.difference(g1_iris)
 
     for iri in g1_only_iris:
-        diff_list.append(
-            {"iri": iri, "field": None, "g1": True, "g2": False, "diff_type": "iri"}
-        )
+        yield {"iri": iri, "field": None, "g1": True, "g2": False, "diff_type": "iri"}
 
     for iri in g2_only_iris:
-        diff_list.append(
-            {"iri": iri, "field": None, "g1": False, "g2": True, "diff_type": "iri"}
-        )
+        yield {"iri": iri, "field": None, "g1": False, "g2": True, "diff_type": "iri"}
 
     # get the IRIs that are in both
     common_iris = g1_iris.intersection(g2_iris)
 
     for iri in common_iris:
-        field_union = set(graph1.concepts[iri].keys()).union(
-            set(graph2.concepts[iri].keys())
-        )
+        concept1 = graph1.concepts[iri]
+        concept2 = graph2.concepts[iri]
 
-        for field in field_union:
-            if field not in graph1.concepts[iri]:
-                diff_list.append(
-                    {
-                        "iri": iri,
-                        "field": field,
-                        "g1": None,
-                        "g2": graph2.concepts[iri][field],
-                        "diff_type": "field",
-                    }
-                )
-            if field not in graph2.concepts[iri]:
-                diff_list.append(
-                    {
-                        "iri": iri,
-                        "field": field,
-                        "g1": graph1.concepts[iri][field],
-                        "g2": None,
-                        "diff_type": "field",
-                    }
-                )
+        for field in CONCEPT_FIELDS:
+            value1 = concept1.get(field)
+            value2 = concept2.get(field)
 
-            # if it's the children field, compare the sets, not ordered lists
-            elif field == "children":
-                if set(graph1.concepts[iri][field]) != set(graph2.concepts[iri][field]):
-                    diff_list.append(
-                        {
-                            "iri": iri,
-                            "field": field,
-                            "g1": graph1.concepts[iri][field],
-                            "g2": graph2.concepts[iri][field],
-                            "diff_type": "field",
-                        }
-                    )
-            # otherwise, compare the values
-            elif graph1.concepts[iri][field] != graph2.concepts[iri][field]:
-                diff_list.append(
-                    {
-                        "iri": iri,
-                        "field": field,
-                        "g1": graph1.concepts[iri][field],
-                        "g2": graph2.concepts[iri][field],
-                        "diff_type": "field",
-                    }
-                )
+            # compare list fields as sets, since their order is not significant
+            if field in CONCEPT_LIST_FIELDS:
+                is_different = frozenset(value1 or ()) != frozenset(value2 or ())
+            else:
+                is_different = value1 != value2
+
+            if is_different:
+                yield {
+                    "iri": iri,
+                    "field": field,
+                    "g1": value1,
+                    "g2": value2,
+                    "diff_type": "field",
+                }
+
+
+def write_json_records(records: Iterable[dict]) -> None:
+    """Write records to stdout as a JSON array one record at a time, in the same layout as
+    json.dumps(list(records), indent=4).
+
+    The stdlib encoder is used instead of lmss.owl.dumps_json, which only serializes a whole document,
+    so that each record is written as soon as it is found.
+
+    Args:
+        records (Iterable[dict]): The records to write.
+    """
+    encoder = json.JSONEncoder(indent=4)
+    separator = "\n"
+    sys.stdout.write("[")
+    for record in records:
+        sys.stdout.write(separator + "    ")
+        # JSON strings can't contain raw newlines, so this only indents the record's own lines
+        for chunk in encoder.iterencode(record):
+            sys.stdout.write(chunk.replace("\n", "\n    "))
+        separator = ",\n"
+    sys.stdout.write("]\n" if separator == "\n" else "\n]\n")
+
+
+def diff_graphs(
+    graph1: LMSSGraph, graph2: LMSSGraph, output_format: str = "csv"
+) -> None:
+    """Diff two graphs and print the results as either plain text, CSV, or JSON records.
+
+    Records are streamed to stdout as they are found rather than collected first.
+
+    Args:
+        graph1 (LMSSGraph): The first graph.
+        graph2 (LMSSGraph): The second graph.
+        output_format (str): The output format. One of "csv", "json", or "text".
+    """
+    diffs = iter_graph_diffs(graph1, graph2)
 
     # print the results
     if output_format == "text":
-        for diff in diff_list:
+        for diff in diffs:
             if diff["diff_type"] == "iri":
                 print(f"IRI={diff['iri']}: {'only' if diff['g1'] else 'not'} in g1")
             elif diff["diff_type"] == "field":
@@ -121,25 +138,21 @@ def diff_graphs(
             sys.stdout, fieldnames=["iri", "field", "g1", "g2", "diff_type"]
         )
         writer.writeheader()
-        writer.writerows(diff_list)
+        writer.writerows(diffs)
     elif output_format == "json":
-        print(json.dumps(diff_list, indent=4))
+        write_json_records(diffs)
 
 
-def diff_triples(
-    graph1: LMSSGraph, graph2: LMSSGraph, output_format: str = "csv"
-) -> None:
-    """Diff two triple sets and print the results as either plain text, CSV, or JSON records.
+def iter_triple_diffs(graph1: LMSSGraph, graph2: LMSSGraph) -> Iterator[dict]:
+    """Yield the triples that are only in one of two graphs one record at a time.
 
     Args:
         graph1 (LMSSGraph): The first graph.
-        graph1 (LMSSGraph): The second graph.
-        output_format (str): The output format. One of "csv", "json", or "text".
-    """
-
-    # store diff findings
-    diff_list = []
+        graph2 (LMSSGraph): The second graph.
 
+    Yields:
+        dict: A diff record with subject, predicate, object, g1, g2, and diff_type keys.
+    """
     # create a set of all tuples on both sides
     g1_triples = set(graph1.triples((None, None, None)))
     g2_triples = set(graph2.triples((None, None, None)))
@@ -149,32 +162,43 @@ def diff_triples(
     g2_only_triples = g2_triples.difference(g1_triples)
 
     for triple in g1_only_triples:
-        diff_list.append(
-            {
-                "subject": triple[0],
-                "predicate": triple[1],
-                "object": triple[2],
-                "g1": True,
-                "g2": False,
-                "diff_type": "triple",
-            }
-        )
+        yield {
+            "subject": triple[0],
+            "predicate": triple[1],
+            "object": triple[2],
+            "g1": True,
+            "g2": False,
+            "diff_type": "triple",
+        }
 
     for triple in g2_only_triples:
-        diff_list.append(
-            {
-                "subject": triple[0],
-                "predicate": triple[1],
-                "object": triple[2],
-                "g1": False,
-                "g2": True,
-                "diff_type": "triple",
-            }
-        )
+        yield {
+            "subject": triple[0],
+            "predicate": triple[1],
+            "object": triple[2],
+            "g1": False,
+            "g2": True,
+            "diff_type": "triple",
+        }
+
+
+def diff_triples(
+    graph1: LMSSGraph, graph2: LMSSGraph, output_format: str = "csv"
+) -> None:
+    """Diff two triple sets and print the results as either plain text, CSV, or JSON records.
+
+    Records are streamed to stdout as they are found rather than collected first.
+
+    Args:
+        graph1 (LMSSGraph): The first graph.
+        graph2 (LMSSGraph): The second graph.
+        output_format (str): The output format. One of "csv", "json", or "text".
+    """
+    diffs = iter_triple_diffs(graph1, graph2)
 
     # print as requested format
     if output_format == "text":
-        for diff in diff_list:
+        for diff in diffs:
             print(
                 f"Subject={diff['subject']}, Predicate={diff['predicate']}, Object={diff['object']}: {'only' if diff['g1'] else 'not'} in g1"
             )
@@ -183,9 +207,9 @@ def diff_triples(
             sys.stdout, fieldnames=["subject", "predicate", "object", "g1", "g2", "diff_type"]
         )
         writer.writeheader()
-        writer.writerows(diff_list)
+        writer.writerows(diffs)
     elif output_format == "json":
-        print(json.dumps(diff_list, indent=4))
+        write_json_records(diffs)
 
 
 def get_graph_from_arg(arg_str: str) -> LMSSGraph:
@@ -16,7 +16,7 @@ from pathlib import Path
 # packages
 import openai
 from rdflib import URIRef, Literal
-from rdflib.namespace import RDF, RDFS, OWL, SKOS
+from rdflib.namespace import RDFS, SKOS
 
 # project
 import lmss.owl
@@ -308,9 +308,7 @@ def translate_concepts(graph: LMSSGraph, concept_set: set[str], target_langs: li
     result_data: list[dict] = []
 
     # iterate through concepts
-    subjects = [s for s in
-                g.subjects(RDF.type, OWL.Class)
-                if str(s) in concept_set]
+    subjects = [iri for iri in graph.concepts if iri in concept_set]
 
     if progress:
         try:
@@ -320,15 +318,10 @@ def translate_concepts(graph: LMSSGraph, concept_set: set[str], target_langs: li
         except ImportError:
             pass
 
-    for concept in subjects:
-        # check if the IRI is in the concept set
+    for iri in subjects:
         try:
-            iri = str(concept)
-            if iri not in concept_set:
-                continue
-
-            # get rdfs:label and prefLabel
-            label = g.value(concept, RDFS.label)
+            # get rdfs:label from the concept record instead of probing the store
+            label = graph.concepts[iri]["label"]
             record = {
                 "iri": iri,
                 "rdfs:label": str(label)
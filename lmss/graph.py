@@ -14,14 +14,13 @@ The LMSSGraph class supports the following methods:
 
 # imports
 import base64
+import gc
 import importlib.resources
+import io
+import sys
 import uuid
 from pathlib import Path
 
-# packages
-import rapidfuzz.fuzz
-from rapidfuzz.distance import DamerauLevenshtein
-
 # rdflib imports
 import rdflib
 import rdflib.resource
@@ -29,33 +28,14 @@ from rdflib import URIRef
 from rdflib.namespace import RDF, RDFS, SKOS, OWL
 
 # lmss imports
+import lmss.graph_cache
 import lmss.owl
+import lmss.rdfxml
+from lmss.hierarchy import ConceptHierarchy
+from lmss.search_index import LABEL_DISTANCE_METRICS, SearchIndex
 
-
-def stopword(text: str) -> str:
-    """This is a hacked replacement for Kelvin NLP stopwording in the MIT release.
-
-    Args:
-        text (str): The text to be stopworded.
-
-    Returns:
-        str: The stopworded text.
-    """
-    return (
-        text.replace(" and ", " ")
-        .replace(" or ", " ")
-        .replace(" of ", " ")
-        .replace(" the ", " ")
-        .replace(" a ", " ")
-        .replace(" an ", " ")
-        .replace(" to ", " ")
-        .replace(" in ", " ")
-        .replace(" for ", " ")
-        .replace(" on ", " ")
-        .replace(" by ", " ")
-        .replace(" with ", " ")
-        .replace(" law ", " ")
-    )
+# stopword is re-exported for callers that imported it from here before the search index moved out
+from lmss.search_index import stopword  # pylint: disable=W0611
 
 
 def get_iri_uuid() -> str:
@@ -67,7 +47,7 @@ def get_iri_uuid() -> str:
     return base64.urlsafe_b64encode(uuid.uuid4().bytes).decode("utf-8").rstrip("=")
 
 
-# pylint: disable=R0903,R0904
+# pylint: disable=R0902,R0903,R0904
 class LMSSGraph(rdflib.Graph):
     """LMSSGraph is a wrapper around rdflib.Graph that provides a convenient, efficient, OOP interface for
     interacting with the SALI LMSS ontology."""
@@ -89,54 +69,12 @@ class LMSSGraph(rdflib.Graph):
             owl_branch (str): The branch of the LMSS ontology repo to use. Defaults to main
                 (lmss.owl.DEFAULT_REPO_BRANCH).
             owl_repo_url (str): The URL of the LMSS ontology repo. Defaults to lmss.owl.DEFAULT_REPO_ARTIFACT_URL.
-            use_cache (bool): Whether to use the local cache. Defaults to True.
+            use_cache (bool): Whether to use the local cache, including the parsed graph sidecar cache.
+                Defaults to True.
         """
 
-        # load the ontology from a local file, remote URL like the official repo, or local cache
-        owl_data: str | None = None
-        if owl_path:
-            if isinstance(owl_path, str):
-                owl_path = Path(owl_path)
-            owl_data = owl_path.read_text(encoding="utf-8")
-        else:
-            if use_cache:
-                try:
-                    with importlib.resources.path(lmss.owl, "lmss.owl") as cache_path:
-                        with open(cache_path, "rt", encoding="utf-8") as owl_file:
-                            owl_data = owl_file.read()
-                except (
-                    FileNotFoundError,
-                    PermissionError,
-                    ModuleNotFoundError,
-                    TypeError,
-                ):
-                    pass
-
-            if not owl_data:
-                owl_data = lmss.owl.get_lmss_owl(owl_branch, owl_repo_url)
-
-                # save to cache if requested
-                if use_cache:
-                    try:
-                        with importlib.resources.path(
-                            lmss.owl, "lmss.owl"
-                        ) as cache_path:
-                            with open(cache_path, "wt", encoding="utf-8") as owl_file:
-                                owl_file.write(owl_data)
-                    except (
-                        FileNotFoundError,
-                        PermissionError,
-                        ModuleNotFoundError,
-                        TypeError,
-                    ):
-                        pass
-
-        # initialize the parent class with the ontology as the data
-        super().__init__()
-        self.parse(
-            data=owl_data,
-            format="xml",
-        )
+        # load the ontology from a local file, remote URL like the official repo, or local cache as raw bytes
+        owl_data = self._read_owl_data(owl_path, owl_branch, owl_repo_url, use_cache)
 
         # set default max depth
         self.default_max_depth = default_max_depth
@@ -147,6 +85,10 @@ class LMSSGraph(rdflib.Graph):
         self.iri_to_label: dict[str, str] = {}
         self.label_to_iri: dict[str, list[str]] = {}
 
+        # set up the search index and the hierarchy, which share the concept numbering and the edgelist
+        self._search_index = SearchIndex()
+        self._hierarchy = ConceptHierarchy(self._search_index.concept_iris, self._search_index.iri_to_idx, self.edges)
+
         # set default excluded top-level concepts
         self.key_concepts = {
             "Actor / Player": "http://lmss.sali.org/R8CdMpOM0RmyrgCCvbpiLS0",
@@ -174,88 +116,179 @@ class LMSSGraph(rdflib.Graph):
             "Status": "http://lmss.sali.org/Rx69EnEj3H3TpcgTfUSoYx",
             "System Identifiers": "http://lmss.sali.org/R8EoZh39tWmXCkmP2Xzjl6E",
         }
+
+        # intern the key concept IRIs, so they are the same strings as the concept IRIs interned in _init_graph
+        self.key_concepts = {
+            concept_label: sys.intern(concept_iri)
+            for concept_label, concept_iri in self.key_concepts.items()
+        }
         self.key_concept_subgraphs: dict[str, set[str]] = {}
 
-        # initialize the graph by doing a forward pass on all nodes and building basic trees
-        self._init_graph()
+        # read the sidecar cache before initializing the parent class, since a cached graph brings its own
+        # pickled store
+        cache_key = lmss.graph_cache.get_graph_cache_key(owl_data, default_max_depth)
 
-    def _init_graph(self):
-        """Initialize the graph by doing a forward pass on all nodes and building basic trees."""
-        # iterate over all concepts
-        for concept in self.subjects(RDF.type, OWL.Class):
-            # get the rdf:about attribute
-            iri = str(concept)
-
-            # get the rdfs:label value
-            label = (
-                self.value(concept, RDFS.label).toPython()
-                if self.value(concept, RDFS.label)
-                else None
-            )
+        # pause the cyclic garbage collector while building, since the many small allocations would otherwise
+        # trigger repeated collections that rescan the whole growing graph
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            payload = lmss.graph_cache.read_graph_cache(cache_key) if use_cache else None
 
-            # update iri->label and label->iri maps
-            self.iri_to_label[iri] = label
-            if label not in self.label_to_iri:
-                self.label_to_iri[label] = []
-            self.label_to_iri[label].append(iri)
-
-            # get the list of skos:prefLabel string literal values
-            pref_labels = [
-                pref_label.toPython()
-                for pref_label in self.objects(concept, SKOS.prefLabel)
-            ]
+            # initialize the parent class on the plain dict-based store, since the ontology is a single graph
+            # and does not need the context tracking of the default store
+            super().__init__(store=payload["store"] if payload else "SimpleMemory")
 
-            # get the list of all skos:altLabel string literal values
-            alt_labels = [
-                alt_label.toPython()
-                for alt_label in self.objects(concept, SKOS.altLabel)
-            ]
+            # restore the derived structures from the sidecar cache; otherwise parse the ontology and
+            # initialize the graph by doing a forward pass on all nodes and building basic trees
+            if payload:
+                self._restore_graph_cache(payload)
+            else:
+                self.parse(source=io.BytesIO(owl_data), format=lmss.rdfxml.CACHED_RDFXML_FORMAT)
+                self._init_graph()
 
-            # get the list of all skos:hiddenLabel string literal values
-            hidden_labels = [
-                hidden_label.toPython()
-                for hidden_label in self.objects(concept, SKOS.hiddenLabel)
-            ]
+                if use_cache:
+                    lmss.graph_cache.save_graph_cache(cache_key, self._get_graph_cache_payload())
+        finally:
+            if gc_enabled:
+                gc.enable()
 
-            # get the list of all skos:definition string literal values
-            definitions = [
-                definition.toPython()
-                for definition in self.objects(concept, SKOS.definition)
-            ]
+    @staticmethod
+    def _read_owl_data(owl_path: Path | str | None, owl_branch: str, owl_repo_url: str, use_cache: bool) -> bytes:
+        """Read the ontology from a local file, remote URL like the official repo, or local cache as raw bytes,
+        which the XML parser reads directly without a decode and re-encode of the whole document.
 
-            # get direct parents
-            parents = [
-                str(parent)
-                for parent in self.objects(concept, RDFS.subClassOf)
-                if str(parent).startswith("http://lmss.sali.org/")
-            ]
+        Args:
+            owl_path (Path | str | None): The path to the local LMSS ontology file.
+            owl_branch (str): The branch of the LMSS ontology repo to use.
+            owl_repo_url (str): The URL of the LMSS ontology repo.
+            use_cache (bool): Whether to use the local cache.
 
-            # get direct children
-            children = [
-                str(child)
-                for child in self.subjects(RDFS.subClassOf, concept)
-                if str(child).startswith("http://lmss.sali.org/")
-            ]
+        Returns:
+            bytes: The raw OWL data.
+        """
+        if owl_path:
+            return Path(owl_path).read_bytes()
 
-            # build the dictionary to store the concept
-            self.concepts[iri] = {
-                "iri": iri,
-                "label": label,
-                "pref_labels": pref_labels,
-                "alt_labels": alt_labels,
-                "hidden_labels": hidden_labels,
-                "definitions": definitions,
-                "top_concept": None,
-                "parents": parents,
-                "children": children,
-            }
+        owl_data: bytes | None = None
+        if use_cache:
+            try:
+                with importlib.resources.path(lmss.owl, "lmss.owl") as cache_path:
+                    with open(cache_path, "rb") as owl_file:
+                        owl_data = owl_file.read()
+            except (FileNotFoundError, PermissionError, ModuleNotFoundError, TypeError):
+                pass
+
+        if not owl_data:
+            owl_data = lmss.owl.get_lmss_owl_bytes(owl_branch, owl_repo_url, use_cache=use_cache)
+
+            # save to cache if requested
+            if use_cache:
+                try:
+                    with importlib.resources.path(lmss.owl, "lmss.owl") as cache_path:
+                        with open(cache_path, "wb") as owl_file:
+                            owl_file.write(owl_data)
+                except (FileNotFoundError, PermissionError, ModuleNotFoundError, TypeError):
+                    pass
+
+        return owl_data
+
+    def _restore_graph_cache(self, payload: dict) -> None:
+        """Restore the derived structures from a sidecar cache payload.
+
+        Args:
+            payload (dict): The payload returned by lmss.graph_cache.read_graph_cache.
+        """
+        self.concepts = payload["concepts"]
+        self.edges = payload["edges"]
+        self.iri_to_label = payload["iri_to_label"]
+        self.label_to_iri = payload["label_to_iri"]
+        self.key_concept_subgraphs = payload["key_concept_subgraphs"]
+        self._search_index = payload["search_index"]
+        self._hierarchy = payload["hierarchy"]
+
+        # pickle memoizes each IRI as one string object shared by all of the restored structures, but not
+        # interned, so point the key concepts at those restored strings instead of the interned literals
+        concept_iris, iri_to_idx = self._search_index.concept_iris, self._search_index.iri_to_idx
+        self.key_concepts = {
+            concept_label: concept_iris[iri_to_idx[concept_iri]] if concept_iri in iri_to_idx else concept_iri
+            for concept_label, concept_iri in self.key_concepts.items()
+        }
+
+    def _get_graph_cache_payload(self) -> dict:
+        """Get the store and derived structures to save to the sidecar cache.
+
+        The store is pickled whole, along with its indices and namespace bindings, so loading it does not
+        re-add every triple.  The hierarchy is saved with its descendant table, so the first unlimited or deep
+        traversal after a cached load does not repeat the component sweep, and it shares the edgelist and
+        concept numbering with the other structures in the same pickle.
+
+        Returns:
+            dict: The payload for lmss.graph_cache.save_graph_cache.
+        """
+        self._hierarchy.get_descendant_table()
+        return {
+            "store": self.store,
+            "concepts": self.concepts,
+            "edges": self.edges,
+            "iri_to_label": self.iri_to_label,
+            "label_to_iri": self.label_to_iri,
+            "key_concept_subgraphs": self.key_concept_subgraphs,
+            "search_index": self._search_index,
+            "hierarchy": self._hierarchy,
+        }
+
+    def _init_graph(self):
+        """Initialize the graph by doing a forward pass on all nodes and building basic trees.
+
+        Each predicate used in the concept records is scanned once and bucketed by subject, instead of
+        querying the store several times per concept.  The per-predicate scans use the store's predicate
+        index, so they only visit the triples they need; a single pass over every triple is no faster.
+
+        The pass runs in a single thread.  It takes a fraction of the time spent parsing the OWL file, and
+        both are pure Python under the GIL, so worker processes would spend more time pickling the partial
+        results than they save; repeated loads are served from the sidecar cache instead.
+        """
+        # bucket the values of each predicate by subject
+        subject_values = {
+            predicate: self._get_subject_values(predicate)
+            for predicate in (
+                RDFS.label,
+                SKOS.prefLabel,
+                SKOS.altLabel,
+                SKOS.hiddenLabel,
+                SKOS.definition,
+                RDFS.subClassOf,
+            )
+        }
+
+        # invert the subClassOf values to get the direct children of each parent
+        subclasses: dict = {}
+        for subject, parents in subject_values[RDFS.subClassOf].items():
+            for parent in parents:
+                subclasses.setdefault(parent, []).append(subject)
+
+        # iterate over all concepts
+        for node in self.subjects(RDF.type, OWL.Class):
+            concept = self._get_concept_record(node, subject_values, subclasses)
+            iri = concept["iri"]
+
+            # update iri->label and label->iri maps
+            self.iri_to_label[iri] = concept["label"]
+            self.label_to_iri.setdefault(concept["label"], []).append(iri)
+
+            # store the concept and add its labels to the search index
+            self.concepts[iri] = concept
+            self._set_lowercase_fields(concept)
+            self._search_index.add_concept(iri, concept)
 
         # build the edgelist for the graph
         for concept in self.concepts.values():
             for parent in concept["parents"]:
-                if parent not in self.edges:
-                    self.edges[parent] = []
-                self.edges[parent].append(concept["iri"])
+                self.edges.setdefault(parent, []).append(concept["iri"])
+
+        # mirror the edgelist as lists of child concept indices for traversals
+        self._hierarchy.build()
 
         # build the key concept subgraphs
         for concept_label, concept_iri in self.key_concepts.items():
@@ -266,6 +299,81 @@ class LMSSGraph(rdflib.Graph):
             for iri in self.key_concept_subgraphs[concept_label]:
                 self.concepts[iri]["top_concept"] = concept_label
 
+    @staticmethod
+    def _get_concept_record(node: rdflib.term.Node, subject_values: dict[URIRef, dict], subclasses: dict) -> dict:
+        """Build the dictionary that stores a concept from the predicate values bucketed by _init_graph.
+
+        Args:
+            node (rdflib.term.Node): The owl:Class node of the concept.
+            subject_values (dict[URIRef, dict]): The values of each predicate, grouped by subject.
+            subclasses (dict): The direct subclasses of each parent node.
+
+        Returns:
+            dict: The concept dictionary, without the lowercased fields.
+        """
+        # get the rdfs:label value
+        label_values = subject_values[RDFS.label].get(node)
+        label = label_values[0].toPython() if label_values and label_values[0] else None
+
+        # get the lists of skos:prefLabel, skos:altLabel, skos:hiddenLabel, and skos:definition values
+        pref_labels, alt_labels, hidden_labels, definitions = (
+            [value.toPython() for value in subject_values[predicate].get(node, [])]
+            for predicate in (SKOS.prefLabel, SKOS.altLabel, SKOS.hiddenLabel, SKOS.definition)
+        )
+
+        # get the rdf:about attribute and the direct parents and children, interned since each IRI is repeated
+        # across the graph structures; rdflib nodes are str subclasses, so the prefix is checked without
+        # converting
+        return {
+            "iri": sys.intern(str(node)),
+            "label": label,
+            "pref_labels": pref_labels,
+            "alt_labels": alt_labels,
+            "hidden_labels": hidden_labels,
+            "definitions": definitions,
+            "top_concept": None,
+            "parents": [
+                sys.intern(str(parent))
+                for parent in subject_values[RDFS.subClassOf].get(node, [])
+                if parent.startswith("http://lmss.sali.org/")
+            ],
+            "children": [
+                sys.intern(str(child))
+                for child in subclasses.get(node, [])
+                if child.startswith("http://lmss.sali.org/")
+            ],
+        }
+
+    def _get_subject_values(self, predicate: URIRef) -> dict[rdflib.term.Node, list]:
+        """Scan all triples with a predicate once and group their objects by subject.
+
+        Args:
+            predicate (URIRef): The predicate to scan.
+
+        Returns:
+            dict[rdflib.term.Node, list]: The list of objects for each subject.
+        """
+        subject_values: dict[rdflib.term.Node, list] = {}
+        for subject, value in self.subject_objects(predicate):
+            subject_values.setdefault(subject, []).append(value)
+        return subject_values
+
+    @staticmethod
+    def _set_lowercase_fields(concept: dict) -> None:
+        """Store lowercased copies of the label and definition fields on a concept dict so that
+        searches only need to lowercase the search term.
+
+        Lowercased labels are interned, since the same label often appears in several fields and
+        concepts, so repeated labels share one string in memory and in the graph cache.
+
+        Args:
+            concept (dict): The concept dictionary to update in place.
+        """
+        concept["label_lower"] = sys.intern(concept["label"].lower()) if concept["label"] else None
+        for field in ("pref_labels", "alt_labels", "hidden_labels"):
+            concept[f"{field}_lower"] = [sys.intern(value.lower()) for value in concept[field] or []]
+        concept["definitions_lower"] = [value.lower() for value in concept["definitions"] or []]
+
     def generate_iri(self, max_tries: int = 10) -> str:
         """Generate a new IRI and ensure it is unique.
 
@@ -284,7 +392,7 @@ class LMSSGraph(rdflib.Graph):
             if tries >= max_tries:
                 raise RuntimeError("Could not generate a unique IRI.")
             iri = f"http://lmss.sali.org/R{get_iri_uuid()}"
-        return iri
+        return sys.intern(iri)
 
     def reset_iri(self, iri: str) -> str:
         """Reset an IRI rdf:about attribute to a new unique value using rdflib.
@@ -298,11 +406,12 @@ class LMSSGraph(rdflib.Graph):
         # find the triplet, remove it, and replace it with the new one
         new_uri = self.generate_iri()
 
-        for subj, pred, obj in self.triples((URIRef(iri), None, None)):  # pylint: disable=E1133
+        # materialize the matches first, since the store indices change while the triples are replaced
+        for subj, pred, obj in list(self.triples((URIRef(iri), None, None))):
             self.remove((subj, pred, obj))
             self.add((URIRef(new_uri), pred, obj))
 
-        for subj, pred, obj in self.triples((None, None, URIRef(iri))):  # pylint: disable=E1133
+        for subj, pred, obj in list(self.triples((None, None, URIRef(iri)))):
             self.remove((subj, pred, obj))
             self.add((subj, pred, URIRef(new_uri)))
 
@@ -310,9 +419,13 @@ class LMSSGraph(rdflib.Graph):
         self.concepts[new_uri] = self.concepts.pop(iri)
         self.concepts[new_uri]["iri"] = new_uri
 
+        # update the search index
+        self._search_index.rename_concept(iri, new_uri)
+
         # update the iri->label and label->iri maps
-        self.iri_to_label[new_uri] = self.iri_to_label.pop(iri)
-        for label in self.label_to_iri:
+        label = self.iri_to_label.pop(iri)
+        self.iri_to_label[new_uri] = label
+        if label in self.label_to_iri:
             self.label_to_iri[label] = [
                 new_uri if x == iri else x for x in self.label_to_iri[label]
             ]
@@ -331,12 +444,15 @@ class LMSSGraph(rdflib.Graph):
             except KeyError:
                 pass
 
+        # clear the traversals memoized by IRI
+        self._hierarchy.clear_caches()
+
         # update the key concept subgraphs
         for concept_label in self.key_concept_subgraphs:
             self.key_concept_subgraphs[concept_label] = {
-                    new_uri if x == iri else x
-                    for x in self.key_concept_subgraphs[concept_label]
-                }
+                new_uri if x == iri else x
+                for x in self.key_concept_subgraphs[concept_label]
+            }
 
         return new_uri
 
@@ -354,301 +470,303 @@ class LMSSGraph(rdflib.Graph):
         """Get the list of child IRIs, by default, recursively up to 16 levels deep.
         For first level children, use self.concepts[iri]["children"] or set max_depth=1.
 
+        Results are memoized per (iri, max_depth) since the edgelist only changes through
+        add_concept and reset_iri, which clear the cache. Depths that already reach every
+        descendant share the memoized unlimited closure. Each call returns a new set, so
+        callers can modify the result without affecting the cache.
+
         Args:
             iri (str): The IRI of the concept to get the children of.
-            max_depth (int): The maximum depth to recurse. Defaults to 8.
+            max_depth (int): The maximum depth to recurse, or -1 for no limit. Defaults to 16.
 
         Returns:
-            set[str]: The list of child IRIs.
-
-        TODO: Decide if we want to use a faster algorithm for loop-handling; see kelvin graph.
+            set[str]: The set of child IRIs.
         """
         # set the default max depth
         if max_depth is None:
             max_depth = self.default_max_depth
 
-        children = set()
+        return set(self._hierarchy.get_children(iri, self._hierarchy.get_closure_depth(iri, max_depth)))
 
-        # iterate through the edgelist
-        for child in self.edges.get(iri, []):
-            # add the child to the list
-            children.add(child)
+    def _get_key_concept_children(self, concept_label: str, max_depth: int | None = None) -> set[str]:
+        """Get the children of a key concept, returning the subgraph precomputed in _init_graph
+        when the default depth is requested, whether implicitly or by value, as a new set.
 
-            # recurse if the max depth has not been reached
-            if max_depth > 1:
-                children |= self.get_children(child, max_depth - 1)
-            elif max_depth == -1:
-                children |= self.get_children(child, max_depth)
+        Args:
+            concept_label (str): The label of the key concept, e.g., "Area of Law".
+            max_depth (int): The maximum depth to recurse. Defaults to 16.
 
-        return children
+        Returns:
+            set[str]: The set of child IRIs.
+        """
+        if max_depth is None or max_depth == self.default_max_depth:
+            return set(self.key_concept_subgraphs[concept_label])
+
+        return self.get_children(self.key_concepts[concept_label], max_depth)
 
     def get_actor_players(self, max_depth: int | None = None) -> set[str]:
         """Get the list of Actor Players.
 
         Args:
-            max_depth (int): The maximum depth to recurse. Defaults to 8.
+            max_depth (int): The maximum depth to recurse. Defaults to 16.
 
         Returns:
-            set[str]: The list of Actor Player IRIs.
+            set[str]: The set of Actor Player IRIs.
         """
-        return self.get_children(self.key_concepts["Actor / Player"], max_depth)
+        return self._get_key_concept_children("Actor / Player", max_depth)
 
     def get_areas_of_law(self, max_depth: int | None = None) -> set[str]:
         """Get the list of Areas of Law.
 
         Args:
-            max_depth (int): The maximum depth to recurse. Defaults to 8.
+            max_depth (int): The maximum depth to recurse. Defaults to 16.
 
         Returns:
-            set[str]: The list of Area of Law IRIs.
+            set[str]: The set of Area of Law IRIs.
         """
-        return self.get_children(self.key_concepts["Area of Law"], max_depth)
+        return self._get_key_concept_children("Area of Law", max_depth)
 
     def get_asset_types(self, max_depth: int | None = None) -> set[str]:
         """Get the list of Asset Types.
 
         Args:
-            max_depth (int): The maximum depth to recurse. Defaults to 8.
+            max_depth (int): The maximum depth to recurse. Defaults to 16.
 
         Returns:
-            set[str]: The list of Asset Type IRIs.
+            set[str]: The set of Asset Type IRIs.
         """
-        return self.get_children(self.key_concepts["Asset Type"], max_depth)
+        return self._get_key_concept_children("Asset Type", max_depth)
 
     def get_communication_modalities(self, max_depth: int | None = None) -> set[str]:
         """Get the list of Communication Modalities.
 
         Args:
-            max_depth (int): The maximum depth to recurse. Defaults to 8.
+            max_depth (int): The maximum depth to recurse. Defaults to 16.
 
         Returns:
-            set[str]: The list of Communication Modality IRIs.
+            set[str]: The set of Communication Modality IRIs.
         """
-        return self.get_children(self.key_concepts["Communication Modality"], max_depth)
+        return self._get_key_concept_children("Communication Modality", max_depth)
 
     def get_currencies(self, max_depth: int | None = None) -> set[str]:
         """Get the list of Currencies.
 
         Args:
-            max_depth (int): The maximum depth to recurse. Defaults to 8.
+            max_depth (int): The maximum depth to recurse. Defaults to 16.
 
         Returns:
-            set[str]: The list of Currency IRIs.
+            set[str]: The set of Currency IRIs.
         """
-        return self.get_children(self.key_concepts["Currency"], max_depth)
+        return self._get_key_concept_children("Currency", max_depth)
 
     def get_data_formats(self, max_depth: int | None = None) -> set[str]:
         """Get the list of Data Formats.
 
         Args:
-            max_depth (int): The maximum depth to recurse. Defaults to 8.
+            max_depth (int): The maximum depth to recurse. Defaults to 16.
 
         Returns:
-            set[str]: The list of Data Format IRIs.
+            set[str]: The set of Data Format IRIs.
         """
-        return self.get_children(self.key_concepts["Data Format"], max_depth)
+        return self._get_key_concept_children("Data Format", max_depth)
 
     def get_document_artifacts(self, max_depth: int | None = None) -> set[str]:
         """Get the list of Document Artifacts.
 
         Args:
-            max_depth (int): The maximum depth to recurse. Defaults to 8.
+            max_depth (int): The maximum depth to recurse. Defaults to 16.
 
         Returns:
-            set[str]: The list of Document Artifact IRIs.
+            set[str]: The set of Document Artifact IRIs.
         """
-        return self.get_children(self.key_concepts["Document / Artifact"], max_depth)
+        return self._get_key_concept_children("Document / Artifact", max_depth)
 
     def get_engagement_terms(self, max_depth: int | None = None) -> set[str]:
         """Get the list of Engagement Terms.
 
         Args:
-            max_depth (int): The maximum depth to recurse. Defaults to 8.
+            max_depth (int): The maximum depth to recurse. Defaults to 16.
 
         Returns:
-            set[str]: The list of Engagement Term IRIs.
+            set[str]: The set of Engagement Term IRIs.
         """
-        return self.get_children(self.key_concepts["Engagement Terms"], max_depth)
+        return self._get_key_concept_children("Engagement Terms", max_depth)
 
     def get_events(self, max_depth: int | None = None) -> set[str]:
         """Get the list of Events.
 
         Args:
-            max_depth (int): The maximum depth to recurse. Defaults to 8.
+            max_depth (int): The maximum depth to recurse. Defaults to 16.
 
         Returns:
-            set[str]: The list of Event IRIs.
+            set[str]: The set of Event IRIs.
         """
-        return self.get_children(self.key_concepts["Event"], max_depth)
+        return self._get_key_concept_children("Event", max_depth)
 
     def get_forums_venues(self, max_depth: int | None = None) -> set[str]:
         """Get the list of Forums / Venues.
 
         Args:
-            max_depth (int): The maximum depth to recurse. Defaults to 8.
+            max_depth (int): The maximum depth to recurse. Defaults to 16.
 
         Returns:
-            set[str]: The list of Forum / Venue IRIs.
+            set[str]: The set of Forum / Venue IRIs.
         """
-        return self.get_children(self.key_concepts["Forums and Venues"], max_depth)
+        return self._get_key_concept_children("Forums and Venues", max_depth)
 
     def get_governmental_bodies(self, max_depth: int | None = None) -> set[str]:
         """Get the list of Governmental Bodies.
 
         Args:
-            max_depth (int): The maximum depth to recurse. Defaults to 8.
+            max_depth (int): The maximum depth to recurse. Defaults to 16.
 
         Returns:
-            set[str]: The list of Governmental Body IRIs.
+            set[str]: The set of Governmental Body IRIs.
         """
-        return self.get_children(self.key_concepts["Governmental Body"], max_depth)
+        return self._get_key_concept_children("Governmental Body", max_depth)
 
     def get_industries(self, max_depth: int | None = None) -> set[str]:
         """Get the list of Industries.
 
         Args:
-            max_depth (int): The maximum depth to recurse. Defaults to 8.
+            max_depth (int): The maximum depth to recurse. Defaults to 16.
 
         Returns:
-            set[str]: The list of Industry IRIs.
+            set[str]: The set of Industry IRIs.
         """
-        return self.get_children(self.key_concepts["Industry"], max_depth)
+        return self._get_key_concept_children("Industry", max_depth)
 
     def get_languages(self, max_depth: int | None = None) -> set[str]:
         """Get the list of Languages.
 
         Args:
-            max_depth (int): The maximum depth to recurse. Defaults to 8.
+            max_depth (int): The maximum depth to recurse. Defaults to 16.
 
         Returns:
-            set[str]: The list of Language IRIs.
+            set[str]: The set of Language IRIs.
         """
-        return self.get_children(self.key_concepts["Language"], max_depth)
+        return self._get_key_concept_children("Language", max_depth)
 
     def get_lmss_types(self, max_depth: int | None = None) -> set[str]:
         """Get the list of LMSS Types.
 
         Args:
-            max_depth (int): The maximum depth to recurse. Defaults to 8.
+            max_depth (int): The maximum depth to recurse. Defaults to 16.
 
         Returns:
-            set[str]: The list of LMSS Type IRIs.
+            set[str]: The set of LMSS Type IRIs.
         """
-        return self.get_children(self.key_concepts["LMSS Type"], max_depth)
+        return self._get_key_concept_children("LMSS Type", max_depth)
 
     def get_legal_authorities(self, max_depth: int | None = None) -> set[str]:
         """Get the list of Legal Authorities.
 
         Args:
-            max_depth (int): The maximum depth to recurse. Defaults to 8.
+            max_depth (int): The maximum depth to recurse. Defaults to 16.
 
         Returns:
-            set[str]: The list of Legal Authority IRIs.
+            set[str]: The set of Legal Authority IRIs.
         """
-        return self.get_children(self.key_concepts["Legal Authorities"], max_depth)
+        return self._get_key_concept_children("Legal Authorities", max_depth)
 
     def get_legal_entities(self, max_depth: int | None = None) -> set[str]:
         """Get the list of Legal Entities.
 
         Args:
-            max_depth (int): The maximum depth to recurse. Defaults to 8.
+            max_depth (int): The maximum depth to recurse. Defaults to 16.
 
         Returns:
-            set[str]: The list of Legal Entity IRIs.
+            set[str]: The set of Legal Entity IRIs.
         """
-        return self.get_children(self.key_concepts["Legal Entity"], max_depth)
+        return self._get_key_concept_children("Legal Entity", max_depth)
 
     def get_locations(self, max_depth: int | None = None) -> set[str]:
         """Get the list of Locations.
 
         Args:
-            max_depth (int): The maximum depth to recurse. Defaults to 8.
+            max_depth (int): The maximum depth to recurse. Defaults to 16.
 
         Returns:
-            set[str]: The list of Location IRIs.
+            set[str]: The set of Location IRIs.
         """
-        return self.get_children(self.key_concepts["Location"], max_depth)
+        return self._get_key_concept_children("Location", max_depth)
 
     def get_matter_narratives(self, max_depth: int | None = None) -> set[str]:
         """Get the list of Matter Narratives.
 
         Args:
-            max_depth (int): The maximum depth to recurse. Defaults to 8.
+            max_depth (int): The maximum depth to recurse. Defaults to 16.
 
         Returns:
-            set[str]: The list of Matter Narrative IRIs.
+            set[str]: The set of Matter Narrative IRIs.
         """
-        return self.get_children(self.key_concepts["Matter Narrative"], max_depth)
+        return self._get_key_concept_children("Matter Narrative", max_depth)
 
     def get_matter_narrative_formats(self, max_depth: int | None = None) -> set[str]:
         """Get the list of Matter Narrative Formats.
 
         Args:
-            max_depth (int): The maximum depth to recurse. Defaults to 8.
+            max_depth (int): The maximum depth to recurse. Defaults to 16.
 
         Returns:
-            set[str]: The list of Matter Narrative Format IRIs.
+            set[str]: The set of Matter Narrative Format IRIs.
         """
-        return self.get_children(
-            self.key_concepts["Matter Narrative Format"], max_depth
-        )
+        return self._get_key_concept_children("Matter Narrative Format", max_depth)
 
     def get_objectives(self, max_depth: int | None = None) -> set[str]:
         """Get the list of Objectives.
 
         Args:
-            max_depth (int): The maximum depth to recurse. Defaults to 8.
+            max_depth (int): The maximum depth to recurse. Defaults to 16.
 
         Returns:
-            set[str]: The list of Objective IRIs.
+            set[str]: The set of Objective IRIs.
         """
-        return self.get_children(self.key_concepts["Objectives"], max_depth)
+        return self._get_key_concept_children("Objectives", max_depth)
 
     def get_services(self, max_depth: int | None = None) -> set[str]:
         """Get the list of Services.
 
         Args:
-            max_depth (int): The maximum depth to recurse. Defaults to 8.
+            max_depth (int): The maximum depth to recurse. Defaults to 16.
 
         Returns:
-            set[str]: The list of Service IRIs.
+            set[str]: The set of Service IRIs.
         """
-        return self.get_children(self.key_concepts["Service"], max_depth)
+        return self._get_key_concept_children("Service", max_depth)
 
     def get_standards_compatibility(self, max_depth: int | None = None) -> set[str]:
         """Get the list of Standards Compatibility.
 
         Args:
-            max_depth (int): The maximum depth to recurse. Defaults to 8.
+            max_depth (int): The maximum depth to recurse. Defaults to 16.
 
         Returns:
-            set[str]: The list of Standards Compatibility IRIs.
+            set[str]: The set of Standards Compatibility IRIs.
         """
-        return self.get_children(
-            self.key_concepts["Standards Compatibility"], max_depth
-        )
+        return self._get_key_concept_children("Standards Compatibility", max_depth)
 
     def get_status(self, max_depth: int | None = None) -> set[str]:
         """Get the list of Status.
 
         Args:
-            max_depth (int): The maximum depth to recurse. Defaults to 8.
+            max_depth (int): The maximum depth to recurse. Defaults to 16.
 
         Returns:
-            set[str]: The list of Status IRIs.
+            set[str]: The set of Status IRIs.
         """
-        return self.get_children(self.key_concepts["Status"], max_depth)
+        return self._get_key_concept_children("Status", max_depth)
 
     def get_system_identifiers(self, max_depth: int | None = None) -> set[str]:
         """Get the list of System Identifiers.
 
         Args:
-            max_depth (int): The maximum depth to recurse. Defaults to 8.
+            max_depth (int): The maximum depth to recurse. Defaults to 16.
 
         Returns:
-            set[str]: The list of System Identifier IRIs.
+            set[str]: The set of System Identifier IRIs.
         """
-        return self.get_children(self.key_concepts["System Identifiers"], max_depth)
+        return self._get_key_concept_children("System Identifiers", max_depth)
 
     # pylint: disable=R0913
     def add_concept(
@@ -729,16 +847,62 @@ class LMSSGraph(rdflib.Graph):
             "alt_labels": alt_labels,
             "hidden_labels": hidden_labels,
             "definitions": definitions,
+            "top_concept": None,
             "parents": parent,
             "children": [],
         }
+        self._set_lowercase_fields(self.concepts[new_iri])
 
-        # add the concept to the parent's children
-        for parent_iri in parent:
-            self.concepts[parent_iri]["children"].append(new_iri)
+        # update iri->label and label->iri maps
+        self.iri_to_label[new_iri] = label
+        self.label_to_iri.setdefault(label, []).append(new_iri)
 
+        self._link_concept(new_iri, parent)
         return new_iri
 
+    def _link_concept(self, new_iri: str, parents: list[str]) -> None:
+        """Add a new concept to the search index, the edgelist, the hierarchy, and any key concept subgraph that
+        contains one of its parents.
+
+        Args:
+            new_iri (str): The IRI of the new concept, already in the concept dict.
+            parents (list[str]): The IRIs of its parent concepts.
+        """
+        # add the concept labels to the search index
+        self._search_index.add_concept(new_iri, self.concepts[new_iri])
+
+        # add the concept to the parent's children and the edgelist
+        for parent_iri in parents:
+            self.concepts[parent_iri]["children"].append(new_iri)
+            self.edges.setdefault(parent_iri, []).append(new_iri)
+        self._hierarchy.add_concept(new_iri, parents)
+
+        # add the concept to any key concept subgraph that contains a parent
+        for concept_label, concept_iri in self.key_concepts.items():
+            subgraph = self.key_concept_subgraphs[concept_label]
+            if any(parent_iri == concept_iri or parent_iri in subgraph for parent_iri in parents):
+                subgraph.add(new_iri)
+                self.concepts[new_iri]["top_concept"] = concept_label
+
+    def _get_search_samples(self, concept_type: str | None, concept_depth: int | None) -> frozenset[int] | None:
+        """Get the concept indices to search, optionally limited to the children of a concept.
+
+        Args:
+            concept_type (str): The concept type to search. Defaults to None.
+            concept_depth (int): The depth to search. Defaults to None.
+
+        Returns:
+            frozenset[int] | None: The concept indices to search, or None for all concepts.
+        """
+        if concept_type is None:
+            return None
+
+        # read the memoized child indices directly rather than mapping them to IRIs and back
+        if concept_depth is None:
+            concept_depth = self.default_max_depth
+        closure_depth = self._hierarchy.get_closure_depth(concept_type, concept_depth)
+        return self._hierarchy.get_child_indices(concept_type, closure_depth)
+
     def search_labels(
         self,
         search_term: str,
@@ -747,6 +911,7 @@ class LMSSGraph(rdflib.Graph):
         num_results: int = 10,
         include_alt_labels: bool = True,
         include_hidden_labels: bool = True,
+        distance_metric: str = "damerau_levenshtein",
     ) -> list[dict]:
         """Search the labels of the ontology.
 
@@ -757,84 +922,53 @@ class LMSSGraph(rdflib.Graph):
             num_results (int): The number of results to return. Defaults to 10.
             include_alt_labels (bool): Whether to include alternative labels. Defaults to True.
             include_hidden_labels (bool): Whether to include hidden labels. Defaults to True.
+            distance_metric (str): The normalized edit distance between the search term and labels, one of
+                "damerau_levenshtein", "osa", "levenshtein", or "indel". Defaults to "damerau_levenshtein".
 
         Returns:
             list[dict]: A list of dictionaries containing the concept data and search information including
             whether the match was an exact substring match and the distance
         """
-        # get the list of concepts to search
-        if concept_type is not None:
-            samples = {
-                iri: self.concepts[iri]
-                for iri in self.get_children(concept_type, concept_depth)
-            }
-        else:
-            samples = self.concepts
-
-        # search the labels
-        for iri, concept in samples.items():
-            # score
-            concept_labels = []
-            if concept["label"]:
-                concept_labels.append(concept["label"])
-
-            if concept["pref_labels"]:
-                concept_labels.extend(concept["pref_labels"])
-
-            if include_alt_labels and concept["alt_labels"]:
-                concept_labels.extend(concept["alt_labels"])
+        if distance_metric not in LABEL_DISTANCE_METRICS:
+            raise ValueError(f"Invalid distance metric: {distance_metric}")
+
+        # get the label fields to leave out
+        skip_fields = frozenset(
+            field
+            for field, included in (("alt_labels", include_alt_labels), ("hidden_labels", include_hidden_labels))
+            if not included
+        )
 
-            if include_hidden_labels and concept["hidden_labels"]:
-                concept_labels.extend(concept["hidden_labels"])
+        sample_set = self._get_search_samples(concept_type, concept_depth)
+        top_samples, distances, matches = self._search_index.search_labels(
+            search_term, sample_set, num_results, skip_fields, distance_metric
+        )
+        flags = {"exact": matches.exact, "substring": matches.substring, "starts_with": matches.starts_with}
+        return self._get_search_results(top_samples, distances, flags)
 
-            # check if the search term is an exact substring match
-            concept["exact"] = any(
-                search_term.lower() == label.lower() for label in concept_labels
-            )
-            concept["substring"] = any(
-                search_term.lower() in label.lower() for label in concept_labels
-            )
+    def _get_search_results(
+        self, top_samples: list[int], distances: list[float] | dict[int, float], flags: dict[str, set[int]]
+    ) -> list[dict]:
+        """Copy the top search concepts with their match flags and distances, leaving the shared concept
+        dictionaries untouched so that results from one search are not overwritten by the next.
 
-            # check if any labels start with the search term
-            concept["starts_with"] = any(
-                label.lower().startswith(search_term.lower())
-                for label in concept_labels
-            )
+        Args:
+            top_samples (list[int]): The top concept indices, in order.
+            distances (list[float] | dict[int, float]): The distance for each concept index.
+            flags (dict[str, set[int]]): The concept indices matched by each flag, such as exact or substring.
 
-            # find the minimum distance between the search term and the concept labels
-            if concept["exact"]:
-                concept["distance"] = 0
-            else:
-                if len(concept_labels) > 0:
-                    distance1 = min(
-                        DamerauLevenshtein.normalized_distance(
-                            stopword(search_term.lower()), stopword(label.lower())
-                        )
-                        for label in concept_labels
-                    )
-
-                    distance2 = min(
-                        rapidfuzz.fuzz.token_set_ratio(
-                            stopword(search_term.lower()), stopword(label.lower())
-                        )
-                        / 100.0
-                        for label in concept_labels
-                    )
-
-                    concept["distance"] = min(distance1, 1.0 - distance2)
-                else:
-                    concept["distance"] = 1.0
-
-        # sort by distance and return the top 10
-        return sorted(
-            samples.values(),
-            key=lambda x: (
-                -x["exact"],
-                -x["starts_with"],
-                -x["substring"],
-                x["distance"],
-            ),
-        )[:num_results]
+        Returns:
+            list[dict]: Copies of the concept dictionaries with the flag and distance keys set.
+        """
+        concept_iris = self._search_index.concept_iris
+        return [
+            {
+                **self.concepts[concept_iris[concept_idx]],
+                **{flag: concept_idx in matched for flag, matched in flags.items()},
+                "distance": distances[concept_idx],
+            }
+            for concept_idx in top_samples
+        ]
 
     def search_definitions(
         self,
@@ -844,48 +978,19 @@ class LMSSGraph(rdflib.Graph):
         num_results: int = 10,
     ) -> list[dict]:
         """Search the definitions of the ontology using partial token set ratios instead of
-        simple string distance functions."""
+        simple string distance functions.
 
-        # get the list of concepts to search
-        if concept_type is not None:
-            samples = {
-                iri: self.concepts[iri]
-                for iri in self.get_children(concept_type, concept_depth)
-            }
-        else:
-            samples = self.concepts
-
-        # search the labels
-        for iri, concept in samples.items():
-            # score
-            if concept["definitions"] and len(concept["definitions"]) > 0:
-                concept["exact"] = any(
-                    search_term.lower() == definition.lower()
-                    for definition in concept["definitions"]
-                )
-                concept["substring"] = any(
-                    search_term.lower() in definition.lower()
-                    for definition in concept["definitions"]
-                )
-                concept["distance"] = (
-                    1.0
-                    - min(
-                        rapidfuzz.fuzz.partial_token_set_ratio(
-                            stopword(search_term.lower()), stopword(definition.lower())
-                        )
-                        / 100.0
-                        for definition in concept["definitions"]
-                    )
-                    if len(concept["definitions"]) > 0
-                    else 1.0
-                )
-            else:
-                concept["exact"] = False
-                concept["substring"] = False
-                concept["distance"] = 0
-
-        # sort by distance and return the top 10
-        return sorted(
-            samples.values(),
-            key=lambda x: (-x["exact"], -x["substring"], -x["distance"]),
-        )[:num_results]
+        Args:
+            search_term (str): The search term.
+            concept_type (str): The concept type to search. Defaults to None.
+            concept_depth (int): The depth to search. Defaults to None.
+            num_results (int): The number of results to return. Defaults to 10.
+
+        Returns:
+            list[dict]: A list of dictionaries containing the concept data and search information including
+            whether the match was an exact substring match and the distance to the best matching definition
+        """
+        top_samples, distances, exact, substring = self._search_index.search_definitions(
+            search_term, self._get_search_samples(concept_type, concept_depth), num_results
+        )
+        return self._get_search_results(top_samples, distances, {"exact": exact, "substring": substring})
@@ -0,0 +1,118 @@
+"""lmss.graph_cache provides the sidecar cache for parsed LMSSGraph objects, stored in lmss.owl.OWL_CACHE_DIR.
+
+Each cached graph is one pickle file named by its cache key, which covers the rdflib version, the default max
+depth, and the OWL data, so a changed ontology or rdflib release never reads a stale graph.  The payload is
+built and restored by lmss.graph.LMSSGraph; this module only reads, writes, and names the files.
+"""
+
+# SPDX-License-Identifier: MIT
+# Copyright (c) 2023 273 Ventures, LLC
+
+# imports
+import hashlib
+import os
+import pickle
+import tempfile
+from pathlib import Path
+
+# rdflib imports
+import rdflib
+
+# lmss imports
+import lmss.owl
+
+# sidecar cache for the parsed graph, stored in lmss.owl.OWL_CACHE_DIR as one file per cache key
+GRAPH_CACHE_SUFFIX = ".graph.pkl"
+GRAPH_CACHE_VERSION = 9
+
+
+def get_graph_cache_key(owl_data: bytes, default_max_depth: int) -> str:
+    """Get the cache key for a graph, which covers the rdflib version, default max depth, and OWL data.
+
+    The rdflib version is included since the store is pickled whole, along with its indices and namespace
+    bindings, and the default max depth since the key concept subgraphs are built with it.
+
+    Args:
+        owl_data (bytes): The raw OWL data the graph is parsed from.
+        default_max_depth (int): The default max depth of the graph.
+
+    Returns:
+        str: The sha256 hex digest of the rdflib version, default max depth, and OWL data.
+    """
+    return hashlib.sha256(
+        f"{rdflib.__version__}:{default_max_depth}:".encode("utf-8") + owl_data
+    ).hexdigest()
+
+
+def get_graph_cache_path(cache_key: str) -> Path:
+    """Get the path of the sidecar cache file for a cache key.
+
+    Args:
+        cache_key (str): The cache key from get_graph_cache_key.
+
+    Returns:
+        Path: The cache file path in lmss.owl.OWL_CACHE_DIR.
+    """
+    return lmss.owl.OWL_CACHE_DIR / f"{cache_key}{GRAPH_CACHE_SUFFIX}"
+
+
+def read_graph_cache(cache_key: str) -> dict | None:
+    """Read the sidecar cache payload if it matches the cache key.
+
+    Args:
+        cache_key (str): The cache key from get_graph_cache_key.
+
+    Returns:
+        dict | None: The cached store and derived structures, or None if there is no matching cache.
+    """
+    try:
+        with open(get_graph_cache_path(cache_key), "rb") as cache_file:
+            cache_version, cached_key, payload = pickle.load(cache_file)
+    except (
+        OSError,
+        EOFError,
+        AttributeError,
+        ImportError,
+        ValueError,
+        TypeError,
+        pickle.UnpicklingError,
+    ):
+        return None
+
+    if cache_version != GRAPH_CACHE_VERSION or cached_key != cache_key:
+        return None
+
+    return payload
+
+
+def save_graph_cache(cache_key: str, payload: dict) -> None:
+    """Save a payload to the sidecar cache.  Failures are ignored, since the cache location may not be writable.
+
+    Args:
+        cache_key (str): The cache key from get_graph_cache_key.
+        payload (dict): The store and derived structures to save.
+    """
+    # write to a uniquely named temporary file first, so that readers never see a partial cache and
+    # concurrent builds do not write over each other's temporary files
+    temp_path = None
+    try:
+        lmss.owl.OWL_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            dir=lmss.owl.OWL_CACHE_DIR,
+            prefix=f"{cache_key}.",
+            suffix=".tmp",
+            delete=False,
+        ) as cache_file:
+            temp_path = cache_file.name
+            pickle.dump(
+                (GRAPH_CACHE_VERSION, cache_key, payload),
+                cache_file,
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+        os.replace(temp_path, get_graph_cache_path(cache_key))
+    except OSError:
+        if temp_path is not None:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
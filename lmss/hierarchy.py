@@ -0,0 +1,304 @@
+"""lmss.hierarchy provides the subclass hierarchy of an LMSSGraph as lists of child concept indices.
+
+The ConceptHierarchy class memoizes breadth-first child traversals and computes a descendant table, the
+unlimited-depth descendants of every concept, in one iterative Tarjan sweep, so that deep and unlimited
+traversals are read from the table instead of walking the edgelist.  It is used by lmss.graph.LMSSGraph.
+"""
+
+# SPDX-License-Identifier: MIT
+# Copyright (c) 2023 273 Ventures, LLC
+
+# imports
+import functools
+from typing import NamedTuple
+
+
+class DescendantTable(NamedTuple):
+    """The strongly connected component of each concept index, the concept indices reachable from each
+    component, including its own members, and the height of each component."""
+
+    component: list[int]
+    descendants: list[frozenset[int]]
+    heights: list[int]
+
+
+def get_descendant_table(child_indices: list[list[int]]) -> DescendantTable:
+    """Get the unlimited-depth descendants of every concept in a single sweep.
+
+    Concepts are grouped into strongly connected components with an iterative Tarjan search, which finishes
+    each component after every component it reaches, so each descendant set is the union of the already
+    finished child sets. Concepts on a cycle share one component and one set.
+
+    Each component also records a height: no reachable concept is more levels below a member than that, so a
+    breadth-first search at least that deep returns the whole descendant set. Acyclic components use their
+    longest downward path, and cycles fall back to the number of other concepts they reach.
+
+    Args:
+        child_indices (list[list[int]]): The child concept indices of each concept index.
+
+    Returns:
+        DescendantTable: The component, descendants, and height table.
+    """
+    search = _ComponentSearch(child_indices)
+    for root in range(len(child_indices)):
+        if search.order[root] == -1:
+            search.visit(root)
+
+    return search.table
+
+
+class _ComponentSearch:
+    """The state of the iterative Tarjan search behind get_descendant_table."""
+
+    def __init__(self, child_indices: list[list[int]]):
+        """Set up the search.
+
+        Args:
+            child_indices (list[list[int]]): The child concept indices of each concept index.
+        """
+        self.child_indices = child_indices
+        self.order = [-1] * len(child_indices)
+        self.low = [0] * len(child_indices)
+        self.stack: list[int] = []
+        self.counter = 0
+        self.table = DescendantTable([-1] * len(child_indices), [], [])
+
+    def visit(self, root: int) -> None:
+        """Search depth-first from a concept with an explicit work stack, closing each component once every
+        concept it reaches has been visited.
+
+        Args:
+            root (int): The concept index to start from.
+        """
+        child_indices, order, low = self.child_indices, self.order, self.low
+        component = self.table.component
+
+        # each work item is a concept and the position of the next child to visit
+        work = [(root, 0)]
+        while work:
+            node, child_pos = work.pop()
+            children = child_indices[node]
+            if child_pos == 0:
+                order[node] = low[node] = self.counter
+                self.counter += 1
+                self.stack.append(node)
+            elif component[children[child_pos - 1]] == -1:
+                # returning from a child that is still open, so it shares a component with this node
+                low[node] = min(low[node], low[children[child_pos - 1]])
+
+            descended = False
+            while child_pos < len(children):
+                child = children[child_pos]
+                child_pos += 1
+                if order[child] == -1:
+                    work.append((node, child_pos))
+                    work.append((child, 0))
+                    descended = True
+                    break
+                if component[child] == -1:
+                    low[node] = min(low[node], order[child])
+
+            if not descended and low[node] == order[node]:
+                self.close_component(node)
+
+    def close_component(self, node: int) -> None:
+        """Close the component rooted at a concept and collect everything it reaches.
+
+        Args:
+            node (int): The concept index at the root of the component.
+        """
+        component, descendants, heights = self.table
+        component_idx = len(descendants)
+        members = []
+        while True:
+            member = self.stack.pop()
+            component[member] = component_idx
+            members.append(member)
+            if member == node:
+                break
+
+        reachable = set(members)
+        height = 0
+        for member in members:
+            for child in self.child_indices[member]:
+                if component[child] != component_idx:
+                    reachable.add(child)
+                    reachable |= descendants[component[child]]
+                    height = max(height, heights[component[child]] + 1)
+        descendants.append(frozenset(reachable))
+        heights.append(height if len(members) == 1 else len(reachable) - 1)
+
+
+class ConceptHierarchy:
+    """The child concept indices of each concept, with memoized traversals, both as concept indices and as
+    IRIs, that are cleared whenever the edgelist changes.
+
+    The concept IRIs, the IRI to concept index map, and the IRI edgelist are shared with the LMSSGraph and its
+    search index rather than copied, so renamed IRIs are seen here without any update.
+    """
+
+    def __init__(
+        self,
+        concept_iris: list[str],
+        iri_to_idx: dict[str, int],
+        edges: dict[str, list[str]],
+    ):
+        """Set up an empty hierarchy over the shared concept numbering and edgelist.
+
+        Args:
+            concept_iris (list[str]): The IRI of each concept index.
+            iri_to_idx (dict[str, int]): The concept index of each IRI.
+            edges (dict[str, list[str]]): The child IRIs of each parent IRI.
+        """
+        self.concept_iris = concept_iris
+        self.iri_to_idx = iri_to_idx
+        self.edges = edges
+        self.child_indices: list[list[int]] = []
+        self._descendant_table: DescendantTable | None = None
+        self._setup_caches()
+
+    def _setup_caches(self) -> None:
+        """Memoize child traversals per instance, both as concept indices and as IRIs."""
+        self.get_child_indices = functools.lru_cache(maxsize=None)(
+            self._traverse_children
+        )
+        self.get_children = functools.lru_cache(maxsize=None)(self._map_children)
+
+    def __getstate__(self) -> dict:
+        """Leave the memoized traversals out of the pickled state, since they wrap bound methods.
+
+        Returns:
+            dict: The instance state without the memoized traversals.
+        """
+        state = self.__dict__.copy()
+        del state["get_child_indices"], state["get_children"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        """Restore the pickled state with empty memoized traversals.
+
+        Args:
+            state (dict): The state from __getstate__.
+        """
+        self.__dict__.update(state)
+        self._setup_caches()
+
+    def build(self) -> None:
+        """Mirror the IRI edgelist as lists of child concept indices for every concept."""
+        self.child_indices = [[] for _ in self.concept_iris]
+        for parent, children in self.edges.items():
+            if parent in self.iri_to_idx:
+                self.child_indices[self.iri_to_idx[parent]] = [
+                    self.iri_to_idx[child] for child in children
+                ]
+        self.clear_caches()
+
+    def add_concept(self, iri: str, parent_iris: list[str]) -> None:
+        """Add a new concept, which must already be in the concept numbering, as a child of its parents.
+
+        Args:
+            iri (str): The IRI of the new concept.
+            parent_iris (list[str]): The IRIs of its parent concepts.
+        """
+        self.child_indices.append([])
+        for parent_iri in parent_iris:
+            self.child_indices[self.iri_to_idx[parent_iri]].append(
+                self.iri_to_idx[iri]
+            )
+        self.clear_caches()
+
+    def clear_caches(self) -> None:
+        """Clear the memoized traversals and descendant table after the edgelist or concept IRIs change."""
+        self.get_child_indices.cache_clear()
+        self.get_children.cache_clear()
+        self._descendant_table = None
+
+    def get_descendant_table(self) -> DescendantTable:
+        """Get the descendant table, computed once until the edgelist changes.
+
+        Returns:
+            DescendantTable: The component, descendants, and height table.
+        """
+        if self._descendant_table is None:
+            self._descendant_table = get_descendant_table(self.child_indices)
+
+        return self._descendant_table
+
+    def get_closure_depth(self, iri: str, max_depth: int) -> int:
+        """Get the memoization depth for a traversal, which is -1 when max_depth already reaches every
+        descendant of the concept, so that every such depth shares one memoized closure.
+
+        Args:
+            iri (str): The IRI of the concept to get the children of.
+            max_depth (int): The maximum depth to recurse, or -1 for no limit.
+
+        Returns:
+            int: The depth to memoize the traversal under.
+        """
+        concept_idx = self.iri_to_idx.get(iri)
+        if max_depth == -1 or concept_idx is None:
+            return max_depth
+
+        component, _, heights = self.get_descendant_table()
+        return -1 if heights[component[concept_idx]] <= max_depth else max_depth
+
+    def _map_children(self, iri: str, max_depth: int) -> frozenset[str]:
+        """Map the memoized child concept indices of a concept back to IRIs.
+
+        Args:
+            iri (str): The IRI of the concept to get the children of.
+            max_depth (int): The maximum depth to recurse, or -1 for no limit.
+
+        Returns:
+            frozenset[str]: The set of child IRIs.
+        """
+        concept_iris = self.concept_iris
+        return frozenset(
+            concept_iris[node] for node in self.get_child_indices(iri, max_depth)
+        )
+
+    def _traverse_children(self, iri: str, max_depth: int) -> frozenset[int]:
+        """Traverse the edgelist with an iterative breadth-first search over concept indices and a visited
+        set, so each node is expanded once even when it is reachable along several paths, and cycles
+        terminate even when max_depth is -1 (unlimited).
+
+        Args:
+            iri (str): The IRI of the concept to get the children of.
+            max_depth (int): The maximum depth to recurse, or -1 for no limit.
+
+        Returns:
+            frozenset[int]: The set of child concept indices.
+        """
+        child_indices = self.child_indices
+        start = self.iri_to_idx.get(iri)
+        if start is not None:
+            frontier = [start]
+            depth = 0
+        else:
+            # parents outside the concept dict only appear in the IRI edgelist
+            frontier = [self.iri_to_idx[child] for child in self.edges.get(iri, [])]
+            depth = 1
+        visited = set(frontier)
+
+        # unlimited traversals, and limited ones deep enough to reach every descendant, are read from the
+        # descendant table
+        component, descendants, heights = self.get_descendant_table()
+        if max_depth == -1 or all(depth + heights[component[node]] <= max_depth for node in frontier):
+            for node in frontier:
+                visited |= descendants[component[node]]
+            frontier = []
+
+        # walk the edgelist one level at a time, always expanding the starting concept
+        while frontier and (max_depth == -1 or depth < max_depth or depth == 0):
+            next_frontier = []
+            for node in frontier:
+                for child in child_indices[node]:
+                    if child not in visited:
+                        visited.add(child)
+                        next_frontier.append(child)
+            frontier = next_frontier
+            depth += 1
+
+        if start is not None:
+            visited.discard(start)
+        return frozenset(visited)
@@ -11,8 +11,12 @@ For a more efficient, higher-level OOP interface, see the lmss.graph module."""
 
 # imports
 import csv
+import functools
+import hashlib
 import json
+import os
 import sys
+import tempfile
 from pathlib import Path
 
 # packages
@@ -20,10 +24,20 @@ import httpx
 import lxml.etree
 import rdflib
 
+# lmss imports
+import lmss.rdfxml
+
 # module constants
 DEFAULT_REPO_ARTIFACT_URL = "https://raw.githubusercontent.com/sali-legal/LMSS/"
 DEFAULT_REPO_BRANCH = "main"
 
+# local download cache for the OWL data, revalidated against the remote ETag/Last-Modified on each fetch; lmss.graph
+# keeps its parsed graph cache here as well
+OWL_CACHE_DIR = Path.home() / ".cache" / "lmss"
+
+# shared HTTP client, created on first use by _get_http_client
+_HTTP_CLIENT: httpx.Client | None = None
+
 # define standard namespace prefixes for use with etree
 NSMAP = {
     "xml": "http://www.w3.org/XML/1998/namespace",
@@ -36,10 +50,158 @@ NSMAP = {
     "oboInOwl": "http://www.geneontology.org/formats/oboInOwl#",
 }
 
+# Clark-notation names for the attributes and class child elements read by get_concepts
+RDF_ABOUT = f"{{{NSMAP['rdf']}}}about"
+RDF_RESOURCE = f"{{{NSMAP['rdf']}}}resource"
+RDFS_LABEL = f"{{{NSMAP['rdfs']}}}label"
+RDFS_SUBCLASS_OF = f"{{{NSMAP['rdfs']}}}subClassOf"
+RDFS_COMMENT = f"{{{NSMAP['rdfs']}}}comment"
+SKOS_ALT_LABEL = f"{{{NSMAP['skos']}}}altLabel"
+SKOS_HIDDEN_LABEL = f"{{{NSMAP['skos']}}}hiddenLabel"
+SKOS_DEFINITION = f"{{{NSMAP['skos']}}}definition"
+
+# XPath expression for the classes in a document, compiled once at import instead of on every call
+CLASS_XPATH = lxml.etree.XPath("//owl:Class", namespaces=NSMAP)
+
+
+def _get_http_client() -> httpx.Client:
+    """_get_http_client returns the shared HTTP/2 client, creating it on first use so that repeated downloads
+    reuse the same connection instead of setting up TLS each time.
+
+    Returns:
+        httpx.Client: The shared client.
+    """
+    global _HTTP_CLIENT  # pylint: disable=W0603
+    if _HTTP_CLIENT is None:
+        _HTTP_CLIENT = httpx.Client(http2=True)
+    return _HTTP_CLIENT
+
+
+def get_lmss_owl_bytes(
+    branch: str = DEFAULT_REPO_BRANCH,
+    repo_artifact_url: str = DEFAULT_REPO_ARTIFACT_URL,
+    use_cache: bool = True,
+) -> bytes:
+    """get_lmss_owl_bytes returns the latest version of the LMSS OWL data from the specified repo as the raw
+    bytes of the response, which the XML parsers can read directly without a decode and re-encode.  LMSS
+    is currently vendored via GitHub using a branch-version strategy, so this method really just determines
+    the correct branch URL for the OWL blob and retrieves it.
+
+    Args:
+        branch (str, optional): The branch (version) to retrieve the OWL data from. Defaults to main, which is
+          latest stable.
+        repo_artifact_url (str, optional): The URL to the repo artifact. Defaults to DEFAULT_REPO_ARTIFACT_URL.
+        use_cache (bool, optional): Whether to use the local download cache in OWL_CACHE_DIR, which is
+          revalidated with a conditional request, and the in-process copy. Defaults to True.
+
+    Returns:
+        bytes: The latest version of the LMSS OWL data as raw XML bytes.
+    """
+    url = f"{repo_artifact_url.rstrip('/')}/{branch.lstrip('/')}/LMSS.owl"
+    if use_cache:
+        return _get_cached_owl_bytes(url)
+
+    response = _get_http_client().get(url)
+    response.raise_for_status()
+    return response.content
+
+
+@functools.lru_cache(maxsize=4)
+def _get_cached_owl_bytes(url: str) -> bytes:
+    """_get_cached_owl_bytes returns the OWL data at the URL, using the copy in OWL_CACHE_DIR when a conditional
+    request shows it is still current.  Results are also memoized in-process, so repeated calls skip the request.
+
+    Args:
+        url (str): The URL of the OWL data.
+
+    Returns:
+        bytes: The OWL data as raw XML bytes.
+    """
+    # the cache files are named by the URL hash, since branch names can contain slashes
+    cache_path = (
+        OWL_CACHE_DIR / f"{hashlib.sha256(url.encode('utf-8')).hexdigest()}.owl"
+    )
+    validator_path = cache_path.with_suffix(".json")
+
+    # send the validators of the cached copy, if there is a readable one
+    cached_data: bytes | None = None
+    headers = {}
+    try:
+        validators = json.loads(validator_path.read_text(encoding="utf-8"))
+        cached_data = cache_path.read_bytes()
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+    except (OSError, ValueError, AttributeError):
+        cached_data = None
+
+    # fall back to the cached copy if the server can't be reached or returns an error
+    try:
+        response = _get_http_client().get(url, headers=headers)
+        if response.status_code == 304 and cached_data is not None:
+            return cached_data
+        response.raise_for_status()
+    except httpx.HTTPError:
+        if cached_data is not None:
+            return cached_data
+        raise
+
+    # save the new copy and its validators, skipping the cache if it can't be written; the old validators are
+    # removed first and the new ones written only once the body is in place, so they never describe another copy
+    try:
+        OWL_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        validator_path.unlink(missing_ok=True)
+        _write_cache_file(cache_path, response.content)
+        _write_cache_file(
+            validator_path,
+            json.dumps(
+                {
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                }
+            ).encode("utf-8"),
+        )
+    except OSError:
+        pass
+
+    return response.content
+
+
+def _write_cache_file(path: Path, data: bytes) -> None:
+    """_write_cache_file writes the data to the path through a temporary file in the same directory, so that
+    concurrent readers never see a partially written file.
+
+    Args:
+        path (Path): The path to write.
+        data (bytes): The data to write.
+    """
+    temp_path = None
+    try:
+        with tempfile.NamedTemporaryFile(
+            dir=path.parent, prefix=f"{path.name}.", suffix=".tmp", delete=False
+        ) as temp_file:
+            temp_path = temp_file.name
+            temp_file.write(data)
+        os.replace(temp_path, path)
+    except OSError:
+        if temp_path is not None:
+            Path(temp_path).unlink(missing_ok=True)
+        raise
+
+
+def clear_owl_cache() -> None:
+    """clear_owl_cache clears the in-process copies of the OWL data, so that the next call to get_lmss_owl_bytes
+    or the functions that use it revalidates the local download cache against the remote.  Long-running processes
+    can call this to pick up upstream changes; the files in OWL_CACHE_DIR are kept.
+    """
+    _get_cached_owl_bytes.cache_clear()
+
 
 def get_lmss_owl(
     branch: str = DEFAULT_REPO_BRANCH,
     repo_artifact_url: str = DEFAULT_REPO_ARTIFACT_URL,
+    use_cache: bool = True,
 ) -> str:
     """get_latest_version returns the latest version of the LMSS OWL data from the specified repo.  LMSS
     is currently vendored via GitHub using a branch-version strategy, so this method really just determines
@@ -49,21 +211,19 @@ def get_lmss_owl(
         branch (str, optional): The branch (version) to retrieve the OWL data from. Defaults to main, which is
           latest stable.
         repo_artifact_url (str, optional): The URL to the repo artifact. Defaults to DEFAULT_REPO_ARTIFACT_URL.
+        use_cache (bool, optional): Whether to use the local download cache and the in-process copy; see
+          get_lmss_owl_bytes. Defaults to True.
 
     Returns:
         str: The latest version of the LMSS OWL data as raw XML.
     """
-    with httpx.Client(http2=True) as client:
-        response = client.get(
-            f"{repo_artifact_url.rstrip('/')}/{branch.lstrip('/')}/LMSS.owl"
-        )
-        response.raise_for_status()
-        return response.content.decode("utf-8")
+    return get_lmss_owl_bytes(branch, repo_artifact_url, use_cache).decode("utf-8")
 
 
 def get_lmss_owl_etree(
     branch: str = DEFAULT_REPO_BRANCH,
     repo_artifact_url: str = DEFAULT_REPO_ARTIFACT_URL,
+    use_cache: bool = True,
 ) -> lxml.etree._ElementTree:
     """get_lmss_owl_etree returns the latest version of the LMSS OWL data from the specified repo as an
     lxml.etree document.
@@ -72,32 +232,44 @@ def get_lmss_owl_etree(
         branch (str, optional): The branch (version) to retrieve the OWL data from. Defaults to main, which is
           latest stable.
         repo_artifact_url (str, optional): The URL to the repo artifact. Defaults to DEFAULT_REPO_ARTIFACT_URL.
+        use_cache (bool, optional): Whether to use the local download cache and the in-process copy; see
+          get_lmss_owl_bytes. Defaults to True.
 
     Returns:
         lxml.etree._ElementTree: The latest version of the LMSS OWL data as an lxml.etree document.
     """
     # setup a parser
-    return lxml.etree.fromstring(get_lmss_owl(branch, repo_artifact_url))
+    return lxml.etree.fromstring(
+        get_lmss_owl_bytes(branch, repo_artifact_url, use_cache)
+    )
 
 
 def get_lmss_owl_rdflib(
     branch: str = DEFAULT_REPO_BRANCH,
     repo_artifact_url: str = DEFAULT_REPO_ARTIFACT_URL,
+    use_rdflib_parser: bool = False,
+    use_cache: bool = True,
 ) -> rdflib.Graph:
     """get_lmss_owl_rdflib returns the latest version of the LMSS OWL data from the specified repo as an
-    rdflib graph.
+    rdflib graph.  The data is read with the lxml-based RDF/XML parser from lmss.rdfxml, which hands any
+    construct it does not support to rdflib's own parser.
 
     Args:
         branch (str, optional): The branch (version) to retrieve the OWL data from. Defaults to main, which is
           latest stable.
         repo_artifact_url (str, optional): The URL to the repo artifact. Defaults to DEFAULT_REPO_ARTIFACT_URL.
+        use_rdflib_parser (bool, optional): Whether to always use rdflib's default RDF/XML parser instead.
+          Defaults to False.
+        use_cache (bool, optional): Whether to use the local download cache and the in-process copy; see
+          get_lmss_owl_bytes. Defaults to True.
 
     Returns:
         rdflib.Graph: The latest version of the LMSS OWL data as an rdflib graph.
     """
     # setup a parser
     return rdflib.Graph().parse(
-        data=get_lmss_owl(branch, repo_artifact_url), format="xml"
+        data=get_lmss_owl_bytes(branch, repo_artifact_url, use_cache),
+        format="xml" if use_rdflib_parser else lmss.rdfxml.CACHED_RDFXML_FORMAT,
     )
 
 
@@ -112,7 +284,7 @@ def get_concepts(
     - label: The label of the concept
     - alt_labels: A list of alternative labels for the concept
     - hidden_label: The hidden label of the concept
-    - subclass_list: A list of concepts that this concept is a subclass of
+    - subclass_list: A list of the named concepts that this concept is a subclass of
     - definition: The definition of the concept
     - comments: A list of comments for the concept
 
@@ -132,56 +304,49 @@ def get_concepts(
         owl_etree = get_lmss_owl_etree(branch, repo_artifact_url)
 
     # get the concepts
-    concepts = owl_etree.xpath("//owl:Class", namespaces=NSMAP)
+    concepts = CLASS_XPATH(owl_etree)
 
     # setup a list to hold the concepts
     concept_data = []
 
     # iterate over the concepts
     for concept in concepts:
-        # get the IRI
-        iri = concept.attrib.get(
-            "{http://www.w3.org/1999/02/22-rdf-syntax-ns#}about", None
-        )
-
-        # get the label
-        label_element = concept.xpath("rdfs:label", namespaces=NSMAP)
-        if label_element:
-            label = label_element[0].text
-        else:
-            label = None
-
-        # get the altLabels
-        alt_labels = [
-            alt_label.text
-            for alt_label in concept.xpath("skos:altLabel", namespaces=NSMAP)
-        ]
-
-        # get the hiddenLabels
-        hidden_labels = [
-            hidden_label.text
-            for hidden_label in concept.xpath("skos:hiddenLabel", namespaces=NSMAP)
-        ]
-
-        # get the skos:definition
-        definition_element = concept.xpath("skos:definition", namespaces=NSMAP)
-        if definition_element:
-            definition = definition_element[0].text
-        else:
-            definition = None
-
-        # get the list of subclass parents from <rdfs:subClassOf rdf:resource=
-        subclass_list = [
-            subclass.attrib.get(
-                "{http://www.w3.org/1999/02/22-rdf-syntax-ns#}resource", None
-            )
-            for subclass in concept.xpath("rdfs:subClassOf", namespaces=NSMAP)
-        ]
-
-        # get the comments
-        comments = [
-            comment.text for comment in concept.xpath("rdfs:comment", namespaces=NSMAP)
-        ]
+        # get the IRI, interned since the same IRIs are repeated as subclass parents
+        iri = concept.get(RDF_ABOUT)
+        if iri is not None:
+            iri = sys.intern(iri)
+
+        # read the label, definition, alt and hidden labels, subclass parents, and comments in one pass over
+        # the child elements, keeping only the first label and definition
+        label_element = None
+        definition_element = None
+        alt_labels = []
+        hidden_labels = []
+        subclass_list = []
+        comments = []
+        for child in concept:
+            tag = child.tag
+            if tag == RDFS_LABEL:
+                if label_element is None:
+                    label_element = child
+            elif tag == SKOS_ALT_LABEL:
+                alt_labels.append(child.text)
+            elif tag == SKOS_HIDDEN_LABEL:
+                hidden_labels.append(child.text)
+            elif tag == SKOS_DEFINITION:
+                if definition_element is None:
+                    definition_element = child
+            elif tag == RDFS_SUBCLASS_OF:
+                # get the named subclass parent from <rdfs:subClassOf rdf:resource=, skipping anonymous
+                # parents like owl:Restriction without descending into them
+                parent_iri = child.get(RDF_RESOURCE)
+                if parent_iri is not None:
+                    subclass_list.append(sys.intern(parent_iri))
+            elif tag == RDFS_COMMENT:
+                comments.append(child.text)
+
+        label = label_element.text if label_element is not None else None
+        definition = definition_element.text if definition_element is not None else None
 
         # update the concept
         concept_data.append(
@@ -200,6 +365,25 @@ def get_concepts(
     return concept_data
 
 
+def dumps_json(data: object) -> bytes:
+    """dumps_json returns the data as indented JSON encoded as UTF-8 bytes.  orjson is used if it is installed
+    (pip install lmss[json]); otherwise the standard library writes the same bytes, with non-ASCII text left
+    unescaped as orjson does.
+
+    Args:
+        data (object): The JSON-serializable data.
+
+    Returns:
+        bytes: The indented JSON as UTF-8 bytes.
+    """
+    try:
+        import orjson  # pylint: disable=C0415
+
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    except ImportError:
+        return json.dumps(data, indent=2, ensure_ascii=False).encode("utf-8")
+
+
 def export_concepts(
     concepts: list[dict] | None = None,
     output_format: str = "csv",
@@ -241,46 +425,54 @@ def export_concepts(
             "comments",
         ]
 
+        # write rows as lists in fieldname order, generated as they are written, with missing fields left empty
+        rows = (
+            [concept.get(field, "") for field in fieldnames] for concept in concepts
+        )
+
         # export the concepts
         if output_file:
             # open the output file
             with open(output_file, "wt", encoding="utf-8") as csv_file:
-                # setup the writer to join lists
-                writer = csv.DictWriter(csv_file, fieldnames=fieldnames)
+                # setup the writer
+                writer = csv.writer(csv_file)
 
                 # write the header
-                writer.writeheader()
+                writer.writerow(fieldnames)
 
                 # write the concepts
-                writer.writerows(concepts)
+                writer.writerows(rows)
 
             # return success
             return True
 
         # setup the writer
-        writer = csv.DictWriter(sys.stdout, fieldnames=fieldnames)
+        writer = csv.writer(sys.stdout)
 
         # write the header
-        writer.writeheader()
+        writer.writerow(fieldnames)
 
         # write the concepts
-        writer.writerows(concepts)
+        writer.writerows(rows)
 
         # return success
         return True
 
     if output_format == "json":
+        # serialize the concepts once as UTF-8 bytes
+        json_data = dumps_json(concepts)
+
         # export the concepts
         if output_file:
-            # open the output file
-            with open(output_file, "wt", encoding="utf-8") as json_file:
-                # write the concepts
-                json.dump(concepts, json_file, indent=2)
+            # open the output file in binary mode, since the data is already encoded
+            with open(output_file, "wb") as json_file:
+                # write the concepts in one call, since json.dump writes each indented chunk separately
+                json_file.write(json_data)
 
             return True
 
         # write the concepts
-        json.dump(concepts, sys.stdout, indent=2)
+        sys.stdout.write(json_data.decode("utf-8"))
 
         # return success
         return True
@@ -4,17 +4,27 @@
 # imports
 import argparse
 import csv
-import json
+import operator
 from pathlib import Path
-from xml.etree import ElementTree
 
 # packages
+import lxml.etree
 import networkx
 
 # projects
 import lmss.owl
 import lmss.graph
 
+# IRIs used to decide which concepts each check applies to
+OWL_THING_IRI = "http://www.w3.org/2002/07/owl#Thing"
+LMSS_IRI_PREFIX = "http://lmss.sali.org"
+
+# Clark-notation name of the xml:lang attribute read by check_xml_lang_attribs
+XML_LANG = f"{{{lmss.owl.NSMAP['xml']}}}lang"
+
+# compiled XPath query for the xml:lang check
+XML_LANG_XPATH = lxml.etree.XPath(".//*[@xml:lang]")
+
 
 class LMSSGraphQA:
     """LMSSGraphQA provides quality assurance/control tools for the SALI LMSS ontology.  It provides the following
@@ -49,132 +59,112 @@ class LMSSGraphQA:
         """
         Check for missing rdfs:label in the LMSS OWL/SKOS graph
         """
-
-        # iterate through all nodes in the graph
-        for iri, concept in self.graph.concepts.items():
-            # skip owl thing - you make my heart sing
-            if iri == "http://www.w3.org/2002/07/owl#Thing":
-                continue
-
-            # check if there is an empty/0-byte rdfs:label
-            if "label" not in concept:
-                self.findings.append(
-                    {
-                        "iri": iri,
-                        "label": None,
-                        "description": "Missing rdfs:label",
-                        "source": "check_rdfs_label",
-                    }
-                )
-            # check if there is a None rdfs:label
-            elif concept["label"] is None:
-                self.findings.append(
-                    {
-                        "iri": iri,
-                        "label": None,
-                        "description": "None rdfs:label",
-                        "source": "check_rdfs_label",
-                    }
-                )
-            # check if there is an empty rdfs:label
-            elif len(concept["label"].strip()) == 0:
-                self.findings.append(
-                    {
-                        "iri": iri,
-                        "label": None,
-                        "description": "Empty rdfs:label",
-                        "source": "check_rdfs_label",
-                    }
-                )
+        self.check_presence(rdfs_label=True)
 
     def check_skos_pref_label(self):
         """
         Check for missing skos:prefLabel in the LMSS OWL/SKOS graph
         """
-
-        # iterate through all nodes in the graph
-        for iri, concept in self.graph.concepts.items():
-            # skip owl thing - you make my heart sing
-            if not iri.startswith("http://lmss.sali.org"):
-                continue
-
-            # get label
-            label = concept.get("label", None)
-
-            # check if there is an empty/0-byte skos:prefLabel
-            if "prefLabel" not in concept:
-                self.findings.append(
-                    {
-                        "iri": iri,
-                        "label": label,
-                        "description": "Missing skos:prefLabel",
-                        "source": "check_skos_pref_label",
-                    }
-                )
-            # check if there is a None skos:prefLabel
-            elif concept["prefLabel"] is None:
-                self.findings.append(
-                    {
-                        "iri": iri,
-                        "label": label,
-                        "description": "None skos:prefLabel",
-                        "source": "check_skos_pref_label",
-                    }
-                )
-            # check if there is an empty skos:prefLabel
-            elif len(concept["prefLabel"].strip()) == 0:
-                self.findings.append(
-                    {
-                        "iri": iri,
-                        "label": label,
-                        "description": "Empty skos:prefLabel",
-                        "source": "check_skos_pref_label",
-                    }
-                )
+        self.check_presence(skos_pref_label=True)
 
     def check_skos_definition(self):
         """
         Check for missing skos:definition in the LMSS OWL/SKOS graph
         """
+        self.check_presence(skos_definition=True)
+
+    def check_presence(
+        self,
+        rdfs_label: bool = False,
+        skos_pref_label: bool = False,
+        skos_definition: bool = False,
+    ):
+        """
+        Run the selected checks for missing, None, or empty rdfs:label, skos:prefLabel, and skos:definition
+        values in a single pass over the concepts, adding each concept's findings in that order
+
+        :param rdfs_label: Check for missing rdfs:label
+        :param skos_pref_label: Check for missing skos:prefLabel
+        :param skos_definition: Check for missing skos:definition
+        """
         # iterate through all nodes in the graph
         for iri, concept in self.graph.concepts.items():
             # skip owl thing - you make my heart sing
-            if not iri.startswith("http://lmss.sali.org"):
+            if rdfs_label and iri != OWL_THING_IRI:
+                # check if there is an empty/0-byte rdfs:label
+                if "label" not in concept:
+                    description = "Missing rdfs:label"
+                # check if there is a None rdfs:label
+                elif concept["label"] is None:
+                    description = "None rdfs:label"
+                # check if there is an empty rdfs:label
+                elif len(concept["label"].strip()) == 0:
+                    description = "Empty rdfs:label"
+                else:
+                    description = None
+
+                if description is not None:
+                    self.findings.append(
+                        {
+                            "iri": iri,
+                            "label": None,
+                            "description": description,
+                            "source": "check_rdfs_label",
+                        }
+                    )
+
+            # the skos checks skip concepts outside LMSS
+            if not iri.startswith(LMSS_IRI_PREFIX):
                 continue
 
             # get label
             label = concept.get("label", None)
 
-            # check if there is an empty/0-byte skos:definition
-            if "definition" not in concept:
-                self.findings.append(
-                    {
-                        "iri": iri,
-                        "label": label,
-                        "description": "Missing skos:definition",
-                        "source": "check_skos_definition",
-                    }
-                )
-            # check if there is a None skos:definition
-            elif concept["definition"] is None:
-                self.findings.append(
-                    {
-                        "iri": iri,
-                        "label": label,
-                        "description": "None skos:definition",
-                        "source": "check_skos_definition",
-                    }
-                )
-            # check if there is an empty skos:definition
-            elif len(concept["definition"].strip()) == 0:
-                self.findings.append(
-                    {
-                        "iri": iri,
-                        "label": label,
-                        "description": "Empty skos:definition",
-                        "source": "check_skos_definition",
-                    }
-                )
+            if skos_pref_label:
+                # check if there is an empty/0-byte skos:prefLabel
+                if "prefLabel" not in concept:
+                    description = "Missing skos:prefLabel"
+                # check if there is a None skos:prefLabel
+                elif concept["prefLabel"] is None:
+                    description = "None skos:prefLabel"
+                # check if there is an empty skos:prefLabel
+                elif len(concept["prefLabel"].strip()) == 0:
+                    description = "Empty skos:prefLabel"
+                else:
+                    description = None
+
+                if description is not None:
+                    self.findings.append(
+                        {
+                            "iri": iri,
+                            "label": label,
+                            "description": description,
+                            "source": "check_skos_pref_label",
+                        }
+                    )
+
+            if skos_definition:
+                # check if there is an empty/0-byte skos:definition
+                if "definition" not in concept:
+                    description = "Missing skos:definition"
+                # check if there is a None skos:definition
+                elif concept["definition"] is None:
+                    description = "None skos:definition"
+                # check if there is an empty skos:definition
+                elif len(concept["definition"].strip()) == 0:
+                    description = "Empty skos:definition"
+                else:
+                    description = None
+
+                if description is not None:
+                    self.findings.append(
+                        {
+                            "iri": iri,
+                            "label": label,
+                            "description": description,
+                            "source": "check_skos_definition",
+                        }
+                    )
 
     def check_label_punctuation(self):
         """
@@ -183,7 +173,7 @@ class LMSSGraphQA:
         # iterate through all nodes in the graph
         for iri, concept in self.graph.concepts.items():
             # skip owl thing - you make my heart sing
-            if not iri.startswith("http://lmss.sali.org"):
+            if not iri.startswith(LMSS_IRI_PREFIX):
                 continue
 
             # get label
@@ -241,35 +231,22 @@ class LMSSGraphQA:
         """
         Check for loops in the LMSS OWL/SKOS graph
         """
-        # iterate through all nodes in the graph and build an edge list
-        edges = set()
-        for iri, concept in self.graph.concepts.items():
-            # skip owl thing - you make my heart sing
-            if not iri.startswith("http://lmss.sali.org"):
-                continue
-
-            # get the children and parents
-            children = concept.get("children", [])
-            parents = concept.get("parents", [])
-
-            # add edges both directions
-            for child in children:
-                edges.add((iri, child))
-            for parent in parents:
-                edges.add((parent, iri))
-
-        # create networkx graph from edges
-        nx_graph = networkx.DiGraph()
-        nx_graph.add_edges_from(edges)
+        # find a witness cycle in each cyclic strongly connected component, removing the closing edge of each cycle
+        # and searching again until the component is acyclic, rather than enumerating every elementary cycle
+        for component_graph in self._get_cyclic_components():
+            while True:
+                try:
+                    cycle_edges = networkx.find_cycle(
+                        component_graph, orientation="original"
+                    )
+                except networkx.NetworkXNoCycle:
+                    break
 
-        #  check if it's a DAG
-        if not networkx.is_directed_acyclic_graph(nx_graph):
-            # get the cycles
-            cycles = list(networkx.simple_cycles(nx_graph))
+                # remove the closing edge so the next search finds a different cycle
+                component_graph.remove_edge(cycle_edges[-1][0], cycle_edges[-1][1])
 
-            # iterate through the cycles
-            for cycle in cycles:
                 # get the label for the first node in the cycle
+                cycle = [edge[0] for edge in cycle_edges]
                 label = self.graph.concepts[cycle[0]].get("label", None)
 
                 # add finding
@@ -282,69 +259,177 @@ class LMSSGraphQA:
                     }
                 )
 
-    # pylint: disable=R0912
+    def _get_cyclic_components(self) -> list[networkx.DiGraph]:
+        """
+        Get the strongly connected components of the subclass graph that contain a cycle
+        """
+        # iterate through all nodes in the graph and build a successor map
+        successors: dict[str, set[str]] = {}
+        for iri, concept in self.graph.concepts.items():
+            # skip owl thing - you make my heart sing
+            if not iri.startswith(LMSS_IRI_PREFIX):
+                continue
+
+            # add the child edges
+            successors.setdefault(iri, set()).update(concept.get("children", []))
+
+            # parents and children come from the same rdfs:subClassOf triples, so a parent edge is only missing
+            # from the child edges when the parent's children are not scanned, i.e., when the parent is not a
+            # concept or is outside LMSS
+            for parent in concept.get("parents", []):
+                if parent not in self.graph.concepts or not parent.startswith(
+                    LMSS_IRI_PREFIX
+                ):
+                    successors.setdefault(parent, set()).add(iri)
+
+        # most graphs are acyclic, so check that with a plain search before finding the components
+        cyclic_components: list[networkx.DiGraph] = []
+        if not self._has_cycle(successors):
+            return cyclic_components
+
+        # find the cyclic strongly connected components with another plain search, and only build a networkx
+        # graph for each of those small components rather than for the whole graph
+        for component in self._get_cyclic_node_sets(successors):
+            component_graph: networkx.DiGraph = networkx.DiGraph()
+            component_graph.add_edges_from(
+                (node, successor)
+                for node in component
+                for successor in successors.get(node, ())
+                if successor in component
+            )
+            cyclic_components.append(component_graph)
+
+        return cyclic_components
+
+    @staticmethod
+    def _has_cycle(successors: dict[str, set[str]]) -> bool:
+        """
+        Check for a cycle in a successor map with an iterative depth-first search, where reaching a node that is
+        still on the search path closes a cycle
+        """
+        # nodes on the current search path map to True and finished nodes to False
+        on_path: dict[str, bool] = {}
+        for root in successors:
+            if root in on_path:
+                continue
+
+            # each stack entry is a node and an iterator over the successors left to visit
+            on_path[root] = True
+            stack = [(root, iter(successors[root]))]
+            while stack:
+                node, node_successors = stack[-1]
+                for successor in node_successors:
+                    state = on_path.get(successor)
+                    if state is None:
+                        on_path[successor] = True
+                        stack.append((successor, iter(successors.get(successor, ()))))
+                        break
+                    if state:
+                        return True
+                else:
+                    on_path[node] = False
+                    stack.pop()
+
+        return False
+
+    @staticmethod
+    def _get_cyclic_node_sets(successors: dict[str, set[str]]) -> list[set[str]]:
+        """
+        Get the node sets of the strongly connected components of a successor map that contain a cycle, i.e.,
+        with more than one node or a self-loop, with an iterative version of Tarjan's algorithm
+        """
+        # each node gets its search order index, and its low link is the lowest index it reaches on the stack
+        index: dict[str, int] = {}
+        low_link: dict[str, int] = {}
+        component_stack: list[str] = []
+        on_stack: set[str] = set()
+        cyclic_node_sets: list[set[str]] = []
+        for root in successors:
+            if root in index:
+                continue
+
+            # each search stack entry is a node and an iterator over the successors left to visit
+            index[root] = low_link[root] = len(index)
+            component_stack.append(root)
+            on_stack.add(root)
+            stack = [(root, iter(successors[root]))]
+            while stack:
+                node, node_successors = stack[-1]
+                for successor in node_successors:
+                    if successor not in index:
+                        index[successor] = low_link[successor] = len(index)
+                        component_stack.append(successor)
+                        on_stack.add(successor)
+                        stack.append((successor, iter(successors.get(successor, ()))))
+                        break
+                    if successor in on_stack and index[successor] < low_link[node]:
+                        low_link[node] = index[successor]
+                else:
+                    stack.pop()
+                    if stack and low_link[node] < low_link[stack[-1][0]]:
+                        low_link[stack[-1][0]] = low_link[node]
+
+                    # a node that reaches nothing lower on the stack is the root of a component
+                    if low_link[node] == index[node]:
+                        component = set()
+                        while True:
+                            member = component_stack.pop()
+                            on_stack.discard(member)
+                            component.add(member)
+                            if member == node:
+                                break
+
+                        if len(component) > 1 or node in successors.get(node, ()):
+                            cyclic_node_sets.append(component)
+
+        return cyclic_node_sets
+
     def check_duplicate_labels(self):
         """
         Check for duplicate labels in the LMSS OWL/SKOS graph
         """
 
-        # setup mapping where keys are: label, label type (e.g., rdfs:label, skos:prefLabel, etc.), and value is list
-        # of IRIs
-        label_maps: dict[str, dict[str, list[str]]] = {}
+        # setup mapping where keys are labels and values are the (label type, IRI) occurrences of the label, e.g.,
+        # ("rdfs:label", iri), so that the many labels used only once need no more than a single list
+        label_maps: dict[str, list[tuple[str, str]]] = {}
 
         # iterate through all concepts and track the rdfs:label, skos:prefLabel, skos:altLabel, and skos:hiddenLabel
         for iri, concept in self.graph.concepts.items():
             label = concept.get("label", None)
             if label is not None:
-                if label not in label_maps:
-                    label_maps[label] = {}
-                if "rdfs:label" not in label_maps[label]:
-                    label_maps[label]["rdfs:label"] = []
-                label_maps[label]["rdfs:label"].append(iri)
-
-            # check pref labels
-            for pref_label in concept.get("pref_labels", []):
-                if pref_label not in label_maps:
-                    label_maps[pref_label] = {}
-                if "skos:prefLabel" not in label_maps[pref_label]:
-                    label_maps[pref_label]["skos:prefLabel"] = []
-                label_maps[pref_label]["skos:prefLabel"].append(iri)
-
-            # check alt labels
-            for alt_label in concept.get("alt_labels", []):
-                if alt_label not in label_maps:
-                    label_maps[alt_label] = {}
-                if "skos:altLabel" not in label_maps[alt_label]:
-                    label_maps[alt_label]["skos:altLabel"] = []
-                label_maps[alt_label]["skos:altLabel"].append(iri)
-
-            # check hidden labels
-            for hidden_label in concept.get("hidden_labels", []):
-                if hidden_label not in label_maps:
-                    label_maps[hidden_label] = {}
-                if "skos:hiddenLabel" not in label_maps[hidden_label]:
-                    label_maps[hidden_label]["skos:hiddenLabel"] = []
-                label_maps[hidden_label]["skos:hiddenLabel"].append(iri)
-
-        # iterate through the label maps and check for duplicates
-        for label, label_type_map in label_maps.items():
-            # keep an IRI set
-            label_iri_set = set()
-
-            # we are de-duping across all label types
-            for iri_list in label_type_map.values():
-                label_iri_set.update(iri_list)
+                label_maps.setdefault(label, []).append(("rdfs:label", iri))
+
+            # check pref, alt, and hidden labels
+            for field, label_type in (
+                ("pref_labels", "skos:prefLabel"),
+                ("alt_labels", "skos:altLabel"),
+                ("hidden_labels", "skos:hiddenLabel"),
+            ):
+                for field_label in concept.get(field, []):
+                    label_maps.setdefault(field_label, []).append((label_type, iri))
+
+        # iterate through the labels with more than one occurrence and check for duplicates across all label types
+        for label, occurrences in label_maps.items():
+            if len(occurrences) < 2:
+                continue
 
             # if there are more than one IRIs, we have a problem
+            label_iri_set = {iri for _, iri in occurrences}
             if len(label_iri_set) > 1:
+                # the description is the same for every IRI with this label
+                label_types = dict.fromkeys(label_type for label_type, _ in occurrences)
+                description = (
+                    f"Duplicate label: {label} "
+                    f"(label types: {','.join(label_types)})"
+                )
+
                 # iterate through the IRIs and add findings
                 for iri in label_iri_set:
                     self.findings.append(
                         {
                             "iri": iri,
                             "label": label,
-                            "description": f"Duplicate label: {label} "
-                            f"(label types: {','.join(label_type_map.keys())})",
+                            "description": description,
                             "source": "check_duplicate_labels",
                         }
                     )
@@ -354,43 +439,50 @@ def check_xml_lang_attribs(owl_buffer: bytes) -> list[dict]:
     Check for xml:lang attributes in the OWL file
     """
 
-    findings = []
+    # findings for each element with an rdf:about IRI, in document order
+    element_findings: dict[lxml.etree._Element, list[dict]] = {}
 
-    # create an ElementTree parser
-    parser = ElementTree.XMLParser()
+    # lxml rejects str input with an encoding declaration, so parse the bytes
+    if isinstance(owl_buffer, str):
+        owl_buffer = owl_buffer.encode("utf-8")
 
     # parse the OWL file
-    owl_tree = ElementTree.fromstring(owl_buffer, parser=parser)
-
-    # findall elements with xml:lang attributes using NSMAP
-    for element in owl_tree.iter():
-        # get IRI and label from rdf:about and rdfs:label attributes
-        iri = element.get("{http://www.w3.org/1999/02/22-rdf-syntax-ns#}about", None)
-        label = element.get("{http://www.w3.org/2000/01/rdf-schema#}label", None)
-
-        if iri is None:
-            continue
-
-        for child_element in element.findall(".//*[@xml:lang]", lmss.owl.NSMAP):
-            # get the xml:lang attribute
-            xml_lang = child_element.get("{http://www.w3.org/XML/1998/namespace}lang", None)
-
-            # check if the xml:lang attribute is empty or not a single token
-            if xml_lang is None or len(xml_lang.split()) > 1:
-                # get the element tag
-                element_tag = child_element.tag.split("}")[1]
-
-                # add finding
-                findings.append(
+    owl_tree = lxml.etree.fromstring(owl_buffer)
+
+    # check every xml:lang attribute in one query, since only the rare invalid ones need their ancestors
+    for child_element in XML_LANG_XPATH(owl_tree):
+        # get the xml:lang attribute
+        xml_lang = child_element.get(XML_LANG, None)
+
+        # check if the xml:lang attribute is empty or not a single token
+        if xml_lang is None or len(xml_lang.split()) > 1:
+            # get the element tag
+            element_tag = child_element.tag.split("}")[1]
+
+            # add a finding under each ancestor with an rdf:about IRI, outermost first, so that the elements are
+            # added in document order
+            for element in reversed(list(child_element.iterancestors())):
+                # get IRI and label from rdf:about and rdfs:label attributes
+                iri = element.get(lmss.owl.RDF_ABOUT)
+                if iri is None:
+                    continue
+
+                element_findings.setdefault(element, []).append(
                     {
                         "iri": iri,
-                        "label": label,
+                        "label": element.get(lmss.owl.RDFS_LABEL, None),
                         "tag": child_element.tag,
                         "description": f"Invalid xml:lang attribute on element {element_tag}: {xml_lang}",
                         "source": "check_xml_lang_attribs",
                     }
                 )
 
+    findings = [
+        finding
+        for element_finding_list in element_findings.values()
+        for finding in element_finding_list
+    ]
+
     return findings
 
 
@@ -461,9 +553,9 @@ if __name__ == "__main__":
     # run checks
     if args.check_xml_lang:
         if args.owl_file is None:
-            owl_buffer = lmss.owl.get_lmss_owl()
+            owl_buffer = lmss.owl.get_lmss_owl_bytes()
         else:
-            owl_buffer = Path(args.owl_file).read_text()
+            owl_buffer = Path(args.owl_file).read_bytes()
         xml_lang_findings = check_xml_lang_attribs(owl_buffer)
         all_findings.extend(xml_lang_findings)
 
@@ -471,12 +563,11 @@ if __name__ == "__main__":
         # setup owl file
         lmss_qa = LMSSGraphQA(args.owl_file, args.owl_branch)
 
-        if not args.disable_rdfs_label:
-            lmss_qa.check_rdfs_label()
-        if not args.disable_skos_pref_label:
-            lmss_qa.check_skos_pref_label()
-        if not args.disable_skos_definition:
-            lmss_qa.check_skos_definition()
+        lmss_qa.check_presence(
+            rdfs_label=not args.disable_rdfs_label,
+            skos_pref_label=not args.disable_skos_pref_label,
+            skos_definition=not args.disable_skos_definition,
+        )
         if not args.disable_label_punctuation:
             lmss_qa.check_label_punctuation()
         if not args.disable_duplicate_labels:
@@ -490,7 +581,7 @@ if __name__ == "__main__":
         print(f"Error running LMSSGraph checks: {e}")
 
     # sort by IRI by default
-    all_findings.sort(key=lambda x: x["iri"])
+    all_findings.sort(key=operator.itemgetter("iri"))
 
     # output findings
     if args.output == "-":
@@ -501,11 +592,11 @@ if __name__ == "__main__":
             )
     elif args.output.lower().endswith("csv"):
         with open(args.output, "wt", encoding="utf-8") as output_file:
-            writer = csv.DictWriter(
-                output_file, fieldnames=["iri", "label", "description", "source"]
-            )
-            writer.writeheader()
-            writer.writerows(all_findings)
+            # write plain rows, which skips DictWriter's per-row key checks
+            fieldnames = ["iri", "label", "description", "source"]
+            writer = csv.writer(output_file)
+            writer.writerow(fieldnames)
+            writer.writerows(map(operator.itemgetter(*fieldnames), all_findings))
     elif args.output.lower().endswith("json"):
-        with open(args.output, "wt", encoding="utf-8") as output_file:
-            json.dump(all_findings, output_file, indent=2)
+        with open(args.output, "wb") as json_file:
+            json_file.write(lmss.owl.dumps_json(all_findings))
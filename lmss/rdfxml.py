@@ -0,0 +1,398 @@
+"""lmss.rdfxml provides an lxml-based RDF/XML parser for rdflib, registered as the CACHED_RDFXML_FORMAT plugin.
+
+The parser reads the plain RDF/XML subset that ontology editors write from an lxml tree, and hands any other
+document to rdflib's own RDF/XML parser.  It is used by lmss.graph to load the ontology and by
+lmss.owl.get_lmss_owl_rdflib.
+"""
+
+# SPDX-License-Identifier: MIT
+# Copyright (c) 2023 273 Ventures, LLC
+
+# imports
+import io
+from urllib.parse import urldefrag, urljoin
+
+# packages
+import lxml.etree
+
+# rdflib imports
+import rdflib
+import rdflib.plugin
+from rdflib import URIRef
+from rdflib.namespace import RDF, is_ncname
+from rdflib.parser import InputSource, Parser
+from rdflib.plugins.parsers.rdfxml import RDFXMLParser, create_parser
+from rdflib.term import BNode, Literal, Node
+
+# rdflib parser plugin name for the RDF/XML parser below
+CACHED_RDFXML_FORMAT = "lmss-xml"
+
+# RDF/XML syntax names used by the lxml tree reader below
+RDF_NS = str(RDF)
+XML_NS = "http://www.w3.org/XML/1998/namespace"
+XML_BASE = f"{{{XML_NS}}}base"
+XML_LANG = f"{{{XML_NS}}}lang"
+RDF_ABOUT, RDF_DATATYPE, RDF_DESCRIPTION, RDF_NODE_ID, RDF_RESOURCE, RDF_TYPE = (
+    f"{RDF_NS}{name}" for name in ("about", "datatype", "Description", "nodeID", "resource", "type")
+)
+RDF_PROPERTY_ELEMENTS = frozenset(
+    f"{RDF_NS}{name}" for name in ("type", "value", "subject", "predicate", "object", "first", "rest")
+)
+
+
+class UnsupportedRDFXMLError(Exception):
+    """Raised by RDFXMLTreeReader for RDF/XML constructs that are left to rdflib's parser."""
+
+
+# pylint: disable=R0903
+class RDFXMLTreeReader:
+    """Read the triples of an RDF/XML document from an lxml tree.
+
+    Only the plain subset of RDF/XML that ontology editors write is supported: node elements with rdf:about,
+    rdf:nodeID, or no subject, and property elements with rdf:resource, rdf:nodeID, one nested node element, or
+    literal text.  Anything else, such as rdf:ID, rdf:parseType, rdf:li, nested xml:base, or property
+    attributes on property elements, raises UnsupportedRDFXMLError so the caller can fall back to rdflib.
+    Triples are produced in the same order as rdflib's SAX handler, so the store iterates concepts in the
+    same order either way.
+    """
+
+    def __init__(self, system_id: str | None = None, preserve_bnode_ids: bool = False):
+        """Set up the reader.
+
+        Args:
+            system_id (str): The public or system ID of the document, used as the base IRI when the document
+                does not set xml:base. Defaults to None.
+            preserve_bnode_ids (bool): Whether to keep rdf:nodeID values as blank node IDs. Defaults to False.
+        """
+        self.system_id = system_id
+        self.preserve_bnode_ids = preserve_bnode_ids
+        self.base: str | None = None
+        self.triples: list[tuple[Node, Node, Node]] = []
+        self._names: dict[str, str] = {}
+        self._iris: dict[str, URIRef] = {}
+        self._bnodes: dict[str, BNode] = {}
+
+    def read(self, data: bytes) -> tuple[list[tuple[str, str]], list[tuple[Node, Node, Node]]]:
+        """Read the namespace declarations and triples of an RDF/XML document.
+
+        Args:
+            data (bytes): The RDF/XML document.
+
+        Returns:
+            tuple[list[tuple[str, str]], list[tuple[Node, Node, Node]]]: The namespace declarations as prefix and
+            namespace pairs in document order, and the triples.
+        """
+        # collect the namespace declarations while building the tree, leaving entity references in text as
+        # entity nodes, which are not supported, rather than loading external entities
+        namespaces = []
+        events = lxml.etree.iterparse(io.BytesIO(data), events=("start-ns",), resolve_entities=False)
+        for _, namespace in events:
+            namespaces.append(namespace)
+
+        # pylint infers the iterparse root as a class rather than an element
+        # pylint: disable=E1101
+        root = events.root
+
+        # the document element must be rdf:RDF, which only sets the base and language
+        if root.tag != f"{{{RDF_NS}}}RDF":
+            raise UnsupportedRDFXMLError(f"Unsupported document element: {root.tag}")
+        base = root.get(XML_BASE)
+        if base is not None:
+            base = urldefrag(base)[0]
+            if self.system_id:
+                base = urljoin(self.system_id, base)
+        elif self.system_id:
+            base = urldefrag(self.system_id)[0]
+        self.base = base
+
+        language = root.get(XML_LANG)
+        for child in self._get_children(root):
+            self._read_node_element(child, language)
+
+        return namespaces, self.triples
+
+    def _get_name(self, tag: str) -> str:
+        """Get the IRI of a namespaced element or attribute name.
+
+        Args:
+            tag (str): The lxml name in {namespace}local form.
+
+        Returns:
+            str: The namespace followed by the local name.
+        """
+        name = self._names.get(tag)
+        if name is None:
+            if not tag.startswith("{"):
+                raise UnsupportedRDFXMLError(f"Unqualified name: {tag}")
+            name = self._names[tag] = tag[1:].replace("}", "", 1)
+        return name
+
+    def _absolutize(self, uri: str) -> URIRef:
+        """Resolve an IRI against the document base in the same way as rdflib's RDF/XML handler.
+
+        Args:
+            uri (str): The IRI to resolve.
+
+        Returns:
+            URIRef: The resolved IRI.
+        """
+        iri = self._iris.get(uri)
+        if iri is None:
+            result = urljoin(self.base or "", uri, allow_fragments=True)
+            if uri and uri[-1] == "#" and result[-1] != "#":
+                result = f"{result}#"
+            iri = self._iris[uri] = URIRef(result)
+        return iri
+
+    def _get_bnode(self, node_id: str) -> BNode:
+        """Get the blank node for an rdf:nodeID value.
+
+        Args:
+            node_id (str): The rdf:nodeID value.
+
+        Returns:
+            BNode: The blank node, shared by every use of the same ID in the document.
+        """
+        if not is_ncname(node_id):
+            raise UnsupportedRDFXMLError(f"Invalid rdf:nodeID: {node_id}")
+        if self.preserve_bnode_ids:
+            return BNode(node_id)
+        bnode = self._bnodes.get(node_id)
+        if bnode is None:
+            bnode = self._bnodes[node_id] = BNode()
+        return bnode
+
+    @staticmethod
+    def _get_children(element: lxml.etree._Element) -> list[lxml.etree._Element]:
+        """Get the child elements of an element, skipping comments and processing instructions.
+
+        Args:
+            element (lxml.etree._Element): The parent element.
+
+        Returns:
+            list[lxml.etree._Element]: The child elements.
+        """
+        children = []
+        for child in element:
+            if isinstance(child.tag, str):
+                children.append(child)
+            elif child.tag is not lxml.etree.Comment and child.tag is not lxml.etree.ProcessingInstruction:
+                raise UnsupportedRDFXMLError(f"Unsupported node: {child!r}")
+        return children
+
+    def _read_node_element(self, element: lxml.etree._Element, language: str | None) -> Node:
+        """Read a node element and its property elements.
+
+        Args:
+            element (lxml.etree._Element): The node element.
+            language (str): The inherited xml:lang value, if any.
+
+        Returns:
+            Node: The subject of the node element.
+        """
+        name = self._get_name(element.tag)
+        attributes = element.attrib
+        if XML_BASE in attributes:
+            raise UnsupportedRDFXMLError("Nested xml:base")
+        language = attributes.get(XML_LANG, language)
+
+        # split the subject attributes from the property attributes
+        about, node_id, properties = self._read_node_attributes(attributes, language)
+
+        if about is not None and node_id is not None:
+            raise UnsupportedRDFXMLError("Both rdf:about and rdf:nodeID")
+        if about is not None:
+            subject: Node = self._absolutize(about)
+        elif node_id is not None:
+            subject = self._get_bnode(node_id)
+        else:
+            subject = BNode()
+
+        # typed node elements add their type before the property attributes
+        if name != RDF_DESCRIPTION:
+            if name.startswith(RDF_NS):
+                raise UnsupportedRDFXMLError(f"Unsupported node element: {name}")
+            self.triples.append((subject, RDF.type, self._absolutize(name)))
+        for predicate, object_node in properties:
+            self.triples.append((subject, predicate, object_node))
+
+        for child in self._get_children(element):
+            self._read_property_element(child, subject, language)
+
+        return subject
+
+    def _read_node_attributes(
+        self, attributes: lxml.etree._Attrib, language: str | None
+    ) -> tuple[str | None, str | None, list[tuple[URIRef, Node]]]:
+        """Split the attributes of a node element into its subject attributes and property attributes.
+
+        Args:
+            attributes (lxml.etree._Attrib): The node element attributes.
+            language (str): The xml:lang value in effect for the node element, if any.
+
+        Returns:
+            tuple[str | None, str | None, list[tuple[URIRef, Node]]]: The rdf:about and rdf:nodeID values, if
+            any, and the predicate and object of each property attribute.
+        """
+        about = node_id = None
+        properties: list[tuple[URIRef, Node]] = []
+        for key, attribute_value in attributes.items():
+            if key.startswith(f"{{{XML_NS}}}"):
+                continue
+            attribute = self._get_name(key)
+            if attribute == RDF_ABOUT:
+                about = attribute_value
+            elif attribute == RDF_NODE_ID:
+                node_id = attribute_value
+            elif attribute == RDF_TYPE:
+                properties.append((RDF.type, self._absolutize(attribute_value)))
+            elif attribute.startswith(RDF_NS):
+                raise UnsupportedRDFXMLError(f"Unsupported node element attribute: {attribute}")
+            else:
+                properties.append((self._absolutize(attribute), Literal(attribute_value, language)))
+
+        return about, node_id, properties
+
+    def _read_property_element(
+        self, element: lxml.etree._Element, subject: Node, language: str | None
+    ) -> None:
+        """Read a property element into a triple about its parent node.
+
+        Args:
+            element (lxml.etree._Element): The property element.
+            subject (Node): The subject of the parent node element.
+            language (str): The inherited xml:lang value, if any.
+        """
+        name = self._get_name(element.tag)
+        if name.startswith(RDF_NS) and name not in RDF_PROPERTY_ELEMENTS:
+            raise UnsupportedRDFXMLError(f"Unsupported property element: {name}")
+        predicate = self._absolutize(name)
+
+        attributes = element.attrib
+        if XML_BASE in attributes:
+            raise UnsupportedRDFXMLError("Nested xml:base")
+        language = attributes.get(XML_LANG, language)
+
+        resource, node_id, datatype = self._read_property_attributes(attributes)
+
+        # a property element has a resource, a node ID, one nested node element, or literal text
+        children = self._get_children(element)
+        has_reference = resource is not None or node_id is not None
+        if has_reference and ((resource is not None and node_id is not None) or datatype is not None or children):
+            raise UnsupportedRDFXMLError(f"Unsupported property element content: {name}")
+        if resource is not None:
+            object_node: Node = self._absolutize(resource)
+        elif node_id is not None:
+            object_node = self._get_bnode(node_id)
+        elif children:
+            if len(children) > 1 or datatype is not None:
+                raise UnsupportedRDFXMLError(f"Unsupported property element content: {name}")
+            object_node = self._read_node_element(children[0], language)
+        else:
+            # literal text continues after any comments or processing instructions
+            text = (element.text or "") + "".join(child.tail or "" for child in element)
+            object_node = Literal(text, None if datatype is not None else language, datatype)
+
+        self.triples.append((subject, predicate, object_node))
+
+    def _read_property_attributes(self, attributes: lxml.etree._Attrib) -> tuple[str | None, str | None, str | None]:
+        """Read the rdf:resource, rdf:nodeID, and rdf:datatype attributes of a property element.
+
+        Args:
+            attributes (lxml.etree._Attrib): The property element attributes.
+
+        Returns:
+            tuple[str | None, str | None, str | None]: The rdf:resource, rdf:nodeID, and rdf:datatype values, if
+            any.
+        """
+        resource = node_id = datatype = None
+        for key, attribute_value in attributes.items():
+            if key.startswith(f"{{{XML_NS}}}"):
+                continue
+            attribute = self._get_name(key)
+            if attribute == RDF_RESOURCE:
+                resource = attribute_value
+            elif attribute == RDF_NODE_ID:
+                node_id = attribute_value
+            elif attribute == RDF_DATATYPE:
+                datatype = attribute_value
+            else:
+                raise UnsupportedRDFXMLError(f"Unsupported property element attribute: {attribute}")
+
+        return resource, node_id, datatype
+
+
+# pylint: disable=R0903
+class CachedRDFXMLParser(RDFXMLParser):
+    """An RDF/XML parser that reads the ontology from an lxml tree when it can, and otherwise memoizes IRI
+    resolution in rdflib's SAX parser.
+
+    rdflib's parser handles every element in Python SAX callbacks and resolves every rdf:about, rdf:resource,
+    and property element name with urljoin, even though the ontology repeats the same few predicate, class, and
+    parent IRIs on nearly every element.  The lxml tree is built in C, and RDFXMLTreeReader produces the same
+    triples for the plain RDF/XML subset the ontology uses.
+    """
+
+    @staticmethod
+    def _read_tree(source: InputSource, sink: rdflib.Graph, preserve_bnode_ids: bool) -> bool:
+        """Read a seekable byte stream source into a graph with RDFXMLTreeReader.
+
+        Args:
+            source (InputSource): The source to parse.
+            sink (rdflib.Graph): The graph to add the triples to.
+            preserve_bnode_ids (bool): Whether to keep rdf:nodeID values as blank node IDs.
+
+        Returns:
+            bool: True if the source was read, or False if the stream was rewound for rdflib's parser.
+        """
+        stream = source.getByteStream()
+        if stream is None or not stream.seekable():
+            return False
+
+        position = stream.tell()
+        reader = RDFXMLTreeReader(source.getPublicId() or source.getSystemId(), preserve_bnode_ids)
+        try:
+            namespaces, triples = reader.read(stream.read())
+        except (UnsupportedRDFXMLError, lxml.etree.XMLSyntaxError):
+            stream.seek(position)
+            return False
+
+        for prefix, namespace in namespaces:
+            sink.bind(prefix or None, namespace, override=False)
+        sink.addN((subject, predicate, object_node, sink) for subject, predicate, object_node in triples)
+        return True
+
+    def parse(self, source: InputSource, sink: rdflib.Graph, **args) -> None:
+        """Parse an RDF/XML source into a graph.
+
+        Args:
+            source (InputSource): The source to parse.
+            sink (rdflib.Graph): The graph to add the triples to.
+            **args: Additional parser arguments, as for RDFXMLParser.
+        """
+        # read the source from an lxml tree if possible
+        if self._read_tree(source, sink, bool(args.get("preserve_bnode_ids"))):
+            return
+
+        # rdflib's parser keeps its SAX reader on the instance, but nothing reads it after parse returns
+        parser = create_parser(source, sink)
+        handler = parser.getContentHandler()
+        if args.get("preserve_bnode_ids") is not None:
+            handler.preserve_bnode_ids = args["preserve_bnode_ids"]
+
+        # resolve each IRI once per base, since the result depends only on the two
+        resolve = handler.absolutize
+        resolved: dict[tuple[str | None, str], URIRef] = {}
+
+        def absolutize(uri: str) -> URIRef:
+            key = (handler.current.base, uri)
+            iri = resolved.get(key)
+            if iri is None:
+                iri = resolved[key] = resolve(uri)
+            return iri
+
+        handler.absolutize = absolutize
+        parser.parse(source)
+
+
+rdflib.plugin.register(CACHED_RDFXML_FORMAT, Parser, "lmss.rdfxml", "CachedRDFXMLParser")
@@ -0,0 +1,991 @@
+"""lmss.search_index provides the flat label and definition index behind LMSSGraph.search_labels and
+LMSSGraph.search_definitions.
+
+The SearchIndex class numbers the concepts of a graph and stores one row per label and per definition across
+parallel lists, so that searches can score every label or definition in batched rapidfuzz calls.  Views over
+those rows for exact, prefix, and substring matching are built on first use and reused until the index
+changes.  Searches return concept indices, which lmss.graph.LMSSGraph maps back to its concept dictionaries.
+"""
+
+# SPDX-License-Identifier: MIT
+# Copyright (c) 2023 273 Ventures, LLC
+
+# imports
+import bisect
+import heapq
+import itertools
+import sys
+from typing import Callable, Iterator, NamedTuple, Sequence
+
+# packages
+import rapidfuzz.fuzz
+import rapidfuzz.process
+from rapidfuzz.distance import DamerauLevenshtein, Indel, Levenshtein, OSA
+
+# normalized edit distances available to search_labels; the bit-parallel metrics are several times faster than
+# the default Damerau-Levenshtein distance, and OSA still counts adjacent transpositions as one edit
+LABEL_DISTANCE_METRICS: dict[str, Callable[..., float]] = {
+    "damerau_levenshtein": DamerauLevenshtein.normalized_distance,
+    "osa": OSA.normalized_distance,
+    "levenshtein": Levenshtein.normalized_distance,
+    "indel": Indel.normalized_distance,
+}
+
+
+class LabelMatches(NamedTuple):
+    """The concept indices with a label matching a search term exactly, as a prefix, or as a substring, where
+    each set contains the previous one."""
+
+    exact: set[int]
+    starts_with: set[int]
+    substring: set[int]
+
+
+def stopword(text: str) -> str:
+    """This is a hacked replacement for Kelvin NLP stopwording in the MIT release.
+
+    Each stopword is removed in its own str.replace pass, in order, so removing one stopword can expose
+    another that a later pass then removes: "x a the y" becomes "x y". A single regex alternation scans
+    once and would leave "x the y", and it is slower than the chained replaces on definition-length text.
+
+    Args:
+        text (str): The text to be stopworded.
+
+    Returns:
+        str: The stopworded text.
+    """
+    return (
+        text.replace(" and ", " ")
+        .replace(" or ", " ")
+        .replace(" of ", " ")
+        .replace(" the ", " ")
+        .replace(" a ", " ")
+        .replace(" an ", " ")
+        .replace(" to ", " ")
+        .replace(" in ", " ")
+        .replace(" for ", " ")
+        .replace(" on ", " ")
+        .replace(" by ", " ")
+        .replace(" with ", " ")
+        .replace(" law ", " ")
+    )
+
+
+# pylint: disable=R0902
+class SearchIndex:
+    """SearchIndex numbers the concepts of an LMSSGraph and stores their labels and definitions as parallel lists
+    of rows, where each row points back to its concept index."""
+
+    def __init__(self):
+        """Set up an empty index."""
+        # concept numbering, shared with lmss.hierarchy.ConceptHierarchy
+        self.concept_iris: list[str] = []
+        self.iri_to_idx: dict[str, int] = {}
+
+        # label and definition rows
+        self._label_concepts: list[int] = []
+        self._label_fields: list[str] = []
+        self._labels_lower: list[str] = []
+        self._labels_stop: list[str] = []
+        self._label_stops: dict[str, str] = {}
+        self._definition_concepts: list[int] = []
+        self._definitions_lower: list[str] = []
+        self._definitions_stop: list[str] = []
+        self._definition_token_rows: dict[str, list[int]] = {}
+
+        # views over the rows, built on first use
+        self._label_views: dict[frozenset[str], tuple[list[int], list[int], list[str], str, list[int]]] = {}
+        self._definition_view: tuple[str, list[int]] | None = None
+        self._label_row_index: dict[str, list[int]] | None = None
+        self._label_prefix_index: tuple[list[str], list[int]] | None = None
+
+    def add_concept(self, iri: str, concept: dict) -> int:
+        """Add a concept and its labels and definitions to the index.
+
+        Each row is stored across parallel lists of concept index, label field, lowercased label, and
+        stopworded lowercased label so that searches can score every label in a single batched rapidfuzz call.
+        Definitions are stored the same way, without the field, along with an inverted index from each
+        whitespace token of the stopworded definition to its rows.
+
+        Args:
+            iri (str): The IRI of the concept to index.
+            concept (dict): The concept dictionary, with the lowercased label and definition fields set.
+
+        Returns:
+            int: The concept index assigned to the concept.
+        """
+        # assign the next concept index
+        concept_idx = len(self.concept_iris)
+        self.concept_iris.append(iri)
+        self.iri_to_idx[iri] = concept_idx
+
+        # add one row per label
+        for field in ("label", "pref_labels", "alt_labels", "hidden_labels"):
+            if field == "label":
+                labels_lower = [concept["label_lower"]] if concept["label"] else []
+            else:
+                labels_lower = concept[f"{field}_lower"]
+
+            for label_lower in labels_lower:
+                # the same label often appears in several fields and concepts, so stopword each one once
+                label_stop = self._label_stops.get(label_lower)
+                if label_stop is None:
+                    label_stop = self._label_stops[label_lower] = sys.intern(stopword(label_lower))
+
+                self._label_concepts.append(concept_idx)
+                self._label_fields.append(field)
+                self._labels_lower.append(label_lower)
+                self._labels_stop.append(label_stop)
+
+        # add one row per definition
+        for definition_lower in concept["definitions_lower"]:
+            row = len(self._definition_concepts)
+            definition_stop = stopword(definition_lower)
+            self._definition_concepts.append(concept_idx)
+            self._definitions_lower.append(definition_lower)
+            self._definitions_stop.append(definition_stop)
+            for token in set(definition_stop.split()):
+                self._definition_token_rows.setdefault(token, []).append(row)
+
+        self.clear_views()
+        return concept_idx
+
+    def rename_concept(self, iri: str, new_iri: str) -> None:
+        """Point a concept index at a new IRI.
+
+        Args:
+            iri (str): The current IRI of the concept.
+            new_iri (str): The new IRI of the concept.
+        """
+        concept_idx = self.iri_to_idx.pop(iri)
+        self.iri_to_idx[new_iri] = concept_idx
+        self.concept_iris[concept_idx] = new_iri
+
+    def clear_views(self) -> None:
+        """Clear the views over the label and definition rows after the rows change."""
+        self._label_views.clear()
+        self._definition_view = None
+        self._label_row_index = None
+        self._label_prefix_index = None
+
+    def _get_samples(self, sample_set: frozenset[int] | None) -> list[int]:
+        """Get the concept indices to search in ontology order.
+
+        Args:
+            sample_set (frozenset[int] | None): The concept indices to search, or None for all concepts.
+
+        Returns:
+            list[int]: The concept indices to search, in ascending order.
+        """
+        if sample_set is None:
+            return list(range(len(self.concept_iris)))
+
+        return sorted(sample_set)
+
+    @staticmethod
+    def _select_top_samples(
+        samples: list[int],
+        num_results: int,
+        distances: list[float] | dict[int, float],
+        priority: set[int],
+        priority_key: Callable[[int], tuple],
+    ) -> list[int]:
+        """Select the top search samples, ranking the priority samples (exact, prefix, or substring matches)
+        first by their full key and then the remaining samples by distance alone, so that only the few priority
+        samples need a tuple key.
+
+        Args:
+            samples (list[int]): The concept indices to rank.
+            num_results (int): The number of results to return.
+            distances (list[float] | dict[int, float]): The distance for each concept index.
+            priority (set[int]): The concept indices that rank ahead of all others.
+            priority_key (Callable[[int], tuple]): The sort key for the priority concept indices.
+
+        Returns:
+            list[int]: The top concept indices, in order.
+        """
+        top_samples = []
+        if priority:
+            top_samples = heapq.nsmallest(
+                num_results,
+                [concept_idx for concept_idx in samples if concept_idx in priority],
+                key=priority_key,
+            )
+
+        # fewer than num_results priority samples are in the list, so the num_results closest samples overall
+        # hold enough of the others; the selection is stable, so ties keep their sample order
+        if len(top_samples) < num_results:
+            top_samples.extend(
+                itertools.islice(
+                    (
+                        concept_idx
+                        for concept_idx in heapq.nsmallest(
+                            num_results, samples, key=distances.__getitem__
+                        )
+                        if concept_idx not in priority
+                    ),
+                    num_results - len(top_samples),
+                )
+            )
+
+        return top_samples
+
+    def _get_label_view(self, skip_fields: frozenset[str]) -> tuple[list[int], list[int], list[str], str, list[int]]:
+        """Get the label rows for a combination of skipped label fields, built once and reused until the index
+        changes.
+
+        The view holds the concept index of each row and the position of its stopworded label among the
+        distinct stopworded labels, since the same label often appears in several fields and concepts and only
+        needs to be scored once. It also holds the lowercased labels joined by NUL characters with the offset
+        where each one starts, so that search_labels can find substring and prefix matches with str.find
+        instead of testing every label.
+
+        Args:
+            skip_fields (frozenset[str]): The label fields to leave out.
+
+        Returns:
+            tuple[list[int], list[int], list[str], str, list[int]]: The row concept indices, the row positions
+            in the distinct labels, the distinct stopworded labels, the joined lowercased labels, and the label
+            start offsets with a final end offset.
+        """
+        label_view = self._label_views.get(skip_fields)
+        if label_view is None:
+            rows = [row for row, field in enumerate(self._label_fields) if field not in skip_fields]
+            label_view = (
+                [self._label_concepts[row] for row in rows],
+                *self._dedupe_rows([self._labels_stop[row] for row in rows]),
+                *self._join_rows([self._labels_lower[row] for row in rows]),
+            )
+            self._label_views[skip_fields] = label_view
+
+        return label_view
+
+    def _get_label_row_index(self) -> dict[str, list[int]]:
+        """Get the label rows of each lowercased label, built once and reused until the index changes, so that
+        exact label matches can be looked up without scanning the labels.
+
+        Returns:
+            dict[str, list[int]]: The label rows of each lowercased label.
+        """
+        if self._label_row_index is None:
+            self._label_row_index = {}
+            for row, label_lower in enumerate(self._labels_lower):
+                self._label_row_index.setdefault(label_lower, []).append(row)
+
+        return self._label_row_index
+
+    def _get_label_prefix_index(self) -> tuple[list[str], list[int]]:
+        """Get the lowercased labels in sorted order along with their label rows, built once and reused until the
+        index changes, so that prefix matches can be found with a binary search instead of a scan.
+
+        Returns:
+            tuple[list[str], list[int]]: The sorted lowercased labels and the label row of each one.
+        """
+        if self._label_prefix_index is None:
+            rows = sorted(range(len(self._labels_lower)), key=self._labels_lower.__getitem__)
+            self._label_prefix_index = ([self._labels_lower[row] for row in rows], rows)
+
+        return self._label_prefix_index
+
+    @staticmethod
+    def _dedupe_rows(texts: list[str]) -> tuple[list[int], list[str]]:
+        """Map each text to its position among the distinct texts, in order of first appearance.
+
+        Args:
+            texts (list[str]): The texts to deduplicate.
+
+        Returns:
+            tuple[list[int], list[str]]: The position of each text among the distinct texts, and the distinct
+            texts.
+        """
+        positions: dict[str, int] = {}
+        text_positions = [positions.setdefault(text, len(positions)) for text in texts]
+        return text_positions, list(positions)
+
+    @staticmethod
+    def _join_rows(texts: list[str]) -> tuple[str, list[int]]:
+        """Join texts into one NUL-terminated string along with the offset where each text starts.
+
+        Args:
+            texts (list[str]): The texts to join.
+
+        Returns:
+            tuple[str, list[int]]: The joined text and the start offsets with a final end offset.
+        """
+        joined_text = "".join(text + "\0" for text in texts)
+        offsets = list(itertools.accumulate((len(text) + 1 for text in texts), initial=0))
+        return joined_text, offsets
+
+    @staticmethod
+    def _find_rows(joined_text: str, offsets: list[int], search_term: str) -> Iterator[tuple[int, bool, bool]]:
+        """Find the rows of a joined text that contain a search term with str.find, jumping to the next row
+        after each hit since the first hit in a row decides whether it is also a prefix or exact match.
+
+        Args:
+            joined_text (str): The NUL-terminated rows from _join_rows.
+            offsets (list[int]): The row start offsets from _join_rows.
+            search_term (str): The search term.
+
+        Yields:
+            tuple[int, bool, bool]: The row, whether the row starts with the search term, and whether the row
+            equals the search term.
+        """
+        # rows cannot contain the separator, so neither can a matching search term
+        if "\0" in search_term:
+            return
+
+        position = joined_text.find(search_term)
+        while 0 <= position < offsets[-1]:
+            row = bisect.bisect_right(offsets, position) - 1
+            is_prefix = position == offsets[row]
+            is_exact = is_prefix and position + len(search_term) + 1 == offsets[row + 1]
+            yield row, is_prefix, is_exact
+            position = joined_text.find(search_term, offsets[row + 1])
+
+    def search_labels(
+        self,
+        search_term: str,
+        sample_set: frozenset[int] | None,
+        num_results: int,
+        skip_fields: frozenset[str],
+        distance_metric: str,
+    ) -> tuple[list[int], list[float] | dict[int, float], LabelMatches]:
+        """Search the labels of the index.
+
+        Args:
+            search_term (str): The search term.
+            sample_set (frozenset[int] | None): The concept indices to search, or None for all concepts.
+            num_results (int): The number of results to return.
+            skip_fields (frozenset[str]): The label fields to leave out.
+            distance_metric (str): The name of the distance metric in LABEL_DISTANCE_METRICS.
+
+        Returns:
+            tuple[list[int], list[float] | dict[int, float], LabelMatches]: The top concept indices in order,
+            the distance for each concept index, and the exact, prefix, and substring matches.
+        """
+        # lowercase the search term once
+        search_term_lower = search_term.lower()
+
+        # when the exact matches alone fill the results, they rank first in sample order, which is ascending
+        # concept index order, with a zero distance, so no label needs to be scored
+        matches = self._find_label_matches(search_term_lower, skip_fields, sample_set, num_results)
+        if len(matches.exact) >= num_results:
+            return heapq.nsmallest(num_results, matches.exact), dict.fromkeys(matches.exact, 0.0), matches
+
+        # score the labels of the sampled concepts, or only of the matched concepts when they alone fill the
+        # results, since every match ranks ahead of every concept without one
+        distances = self._score_label_rows(
+            stopword(search_term_lower),
+            self._get_scored_label_rows(
+                skip_fields, matches.substring if len(matches.substring) >= num_results else sample_set, matches
+            ),
+            distance_metric,
+            num_results,
+            matches,
+        )
+
+        # select the top results by distance without sorting every sample
+        top_samples = self._select_top_samples(
+            self._get_samples(sample_set),
+            num_results,
+            distances,
+            matches.substring,
+            lambda x: (
+                -(x in matches.exact),
+                -(x in matches.starts_with),
+                -(x in matches.substring),
+                distances[x],
+            ),
+        )
+        return top_samples, distances, matches
+
+    def _find_label_matches(
+        self,
+        search_term_lower: str,
+        skip_fields: frozenset[str],
+        sample_set: frozenset[int] | None,
+        num_results: int,
+    ) -> LabelMatches:
+        """Find the concepts with a label equal to, starting with, or containing the lowercased search term.
+
+        Exact matches are looked up in the label row index without scanning the labels.  When the exact matches
+        alone fill the results, no other matches are needed, and when the prefix matches alone fill them, they
+        rank ahead of the other substring matches, so the labels are only scanned for substrings otherwise.
+
+        Args:
+            search_term_lower (str): The lowercased search term.
+            skip_fields (frozenset[str]): The label fields to leave out.
+            sample_set (frozenset[int] | None): The concept indices to search, or None for all concepts.
+            num_results (int): The number of results to return.
+
+        Returns:
+            LabelMatches: The exact, prefix, and substring matches.
+        """
+        exact = {
+            self._label_concepts[row]
+            for row in self._get_label_row_index().get(search_term_lower, ())
+            if self._label_fields[row] not in skip_fields
+            and (sample_set is None or self._label_concepts[row] in sample_set)
+        }
+        if len(exact) >= num_results:
+            return LabelMatches(exact, exact, exact)
+
+        starts_with = exact | self._find_prefix_labels(search_term_lower, skip_fields, sample_set)
+        substring = set(starts_with)
+        if len(starts_with) < num_results:
+            substring |= self._find_substring_labels(search_term_lower, skip_fields, sample_set)
+
+        return LabelMatches(exact, starts_with, substring)
+
+    def _find_prefix_labels(
+        self, search_term_lower: str, skip_fields: frozenset[str], sample_set: frozenset[int] | None
+    ) -> set[int]:
+        """Find the concepts with a label starting with the lowercased search term with a binary search over the
+        sorted labels.
+
+        Args:
+            search_term_lower (str): The lowercased search term.
+            skip_fields (frozenset[str]): The label fields to leave out.
+            sample_set (frozenset[int] | None): The concept indices to search, or None for all concepts.
+
+        Returns:
+            set[int]: The concept indices with a prefix match.
+        """
+        sorted_labels, sorted_rows = self._get_label_prefix_index()
+        starts_with: set[int] = set()
+        position = bisect.bisect_left(sorted_labels, search_term_lower)
+        while position < len(sorted_labels) and sorted_labels[position].startswith(search_term_lower):
+            row = sorted_rows[position]
+            if self._label_fields[row] not in skip_fields and (
+                sample_set is None or self._label_concepts[row] in sample_set
+            ):
+                starts_with.add(self._label_concepts[row])
+            position += 1
+
+        return starts_with
+
+    def _find_substring_labels(
+        self, search_term_lower: str, skip_fields: frozenset[str], sample_set: frozenset[int] | None
+    ) -> set[int]:
+        """Find the concepts with a label containing the lowercased search term in the joined labels of the
+        label view.
+
+        Args:
+            search_term_lower (str): The lowercased search term.
+            skip_fields (frozenset[str]): The label fields to leave out.
+            sample_set (frozenset[int] | None): The concept indices to search, or None for all concepts.
+
+        Returns:
+            set[int]: The concept indices with a substring match.
+        """
+        row_concepts, _, _, joined_labels, label_offsets = self._get_label_view(skip_fields)
+        substring: set[int] = set()
+        for row, _, _ in self._find_rows(joined_labels, label_offsets, search_term_lower):
+            concept_idx = row_concepts[row]
+            if sample_set is None or concept_idx in sample_set:
+                substring.add(concept_idx)
+
+        return substring
+
+    def _get_scored_label_rows(
+        self,
+        skip_fields: frozenset[str],
+        score_set: set[int] | frozenset[int] | None,
+        matches: LabelMatches,
+    ) -> tuple[list[int], list[int], list[str], set[int]]:
+        """Get the label rows to score, limited to the rows of a set of concepts when there is one, along with
+        the distinct labels of the prefix and substring matches, which must be scored exactly since they rank
+        first whatever their distance.
+
+        Exact matches are left out of a limited set of rows, since their distance is already zero.
+
+        Args:
+            skip_fields (frozenset[str]): The label fields to leave out.
+            score_set (set[int] | frozenset[int] | None): The concept indices to score, or None for all rows.
+            matches (LabelMatches): The exact, prefix, and substring matches.
+
+        Returns:
+            tuple[list[int], list[int], list[str], set[int]]: The row concept indices, the row positions in the
+            distinct labels, the distinct stopworded labels, and the positions of the labels to score exactly.
+        """
+        row_concepts, row_unique, unique_labels, _, _ = self._get_label_view(skip_fields)
+        if score_set is not None:
+            rows = [
+                row
+                for row, concept_idx in enumerate(row_concepts)
+                if concept_idx in score_set and concept_idx not in matches.exact
+            ]
+            row_concepts = [row_concepts[row] for row in rows]
+            row_unique, unique_labels = self._dedupe_rows(
+                [unique_labels[row_unique[row]] for row in rows]
+            )
+
+        rescore = matches.substring - matches.exact
+        rescore_labels = (
+            {
+                label_idx
+                for concept_idx, label_idx in zip(row_concepts, row_unique)
+                if concept_idx in rescore
+            }
+            if rescore
+            else set()
+        )
+        return row_concepts, row_unique, unique_labels, rescore_labels
+
+    def _score_label_rows(
+        self,
+        search_term_stop: str,
+        label_rows: tuple[list[int], list[int], list[str], set[int]],
+        distance_metric: str,
+        num_results: int,
+        matches: LabelMatches,
+    ) -> list[float]:
+        """Score the label rows against the search term and get the distance of each concept, which is the lower
+        of its closest label distance and one minus its lowest token set ratio, or zero for an exact match.
+
+        Each distinct label is scored once in batched calls and the minimum is taken over each concept's rows
+        into per-concept columns indexed by concept index.  Labels that cannot change the results are cut off in
+        the scorers, except for the labels of the prefix and substring matches.
+
+        Args:
+            search_term_stop (str): The stopworded search term.
+            label_rows (tuple[list[int], list[int], list[str], set[int]]): The label rows to score, from
+                _get_scored_label_rows.
+            distance_metric (str): The name of the distance metric in LABEL_DISTANCE_METRICS.
+            num_results (int): The number of results to return.
+            matches (LabelMatches): The exact, prefix, and substring matches.
+
+        Returns:
+            list[float]: The distance of each concept index, where concepts without scored labels are as far as
+            possible from the search term.
+        """
+        num_concepts = len(self.concept_iris)
+        if distance_metric == "damerau_levenshtein":
+            label_distances = self._get_damerau_levenshtein_distances(
+                search_term_stop, label_rows, num_concepts, num_results, matches.substring
+            )
+        else:
+            label_distances = [
+                score
+                for _, score, _ in rapidfuzz.process.extract_iter(
+                    search_term_stop,
+                    label_rows[2],
+                    scorer=LABEL_DISTANCE_METRICS[distance_metric],
+                )
+            ]
+        min_distances = self._get_concept_minimums(label_rows, label_distances, num_concepts, 2.0)
+
+        # labels below the ratio cutoff count as a zero ratio, which cannot improve a concept's distance
+        min_ratios = self._get_concept_minimums(
+            label_rows,
+            self._get_token_set_ratios(
+                search_term_stop, label_rows, self._get_ratio_cutoff(min_distances, matches.substring, num_results)
+            ),
+            num_concepts,
+            100.0,
+        )
+
+        # concepts without scored labels are as far as possible from the search term; the two distances are
+        # compared inline rather than with min(), since this runs once per concept on every search
+        distances = [
+            1.0
+            if distance > 1.0
+            else distance
+            if distance < (ratio_distance := 1.0 - ratio / 100.0)
+            else ratio_distance
+            for distance, ratio in zip(min_distances, min_ratios)
+        ]
+        for concept_idx in matches.exact:
+            distances[concept_idx] = 0.0
+
+        return distances
+
+    @staticmethod
+    def _get_concept_minimums(
+        label_rows: tuple[list[int], list[int], list[str], set[int]],
+        label_scores: list[float],
+        num_concepts: int,
+        default: float,
+    ) -> list[float]:
+        """Get the minimum score over each concept's label rows, indexed by concept index.
+
+        Args:
+            label_rows (tuple[list[int], list[int], list[str], set[int]]): The scored label rows.
+            label_scores (list[float]): The score of each distinct label.
+            num_concepts (int): The number of concepts in the index.
+            default (float): The score of a concept without label rows.
+
+        Returns:
+            list[float]: The minimum score of each concept index.
+        """
+        min_scores = [default] * num_concepts
+        for concept_idx, label_idx in zip(label_rows[0], label_rows[1]):
+            if label_scores[label_idx] < min_scores[concept_idx]:
+                min_scores[concept_idx] = label_scores[label_idx]
+
+        return min_scores
+
+    @staticmethod
+    def _get_ratio_cutoff(min_distances: list[float], priority: set[int], num_results: int) -> float:
+        """Get the token set ratio below which a label cannot change the results.  Concepts without a prefix or
+        substring match can only reach the top results with a distance no worse than the k-th best label
+        distance among them, so lower ratios can be cut off.
+
+        Args:
+            min_distances (list[float]): The closest label distance of each concept index.
+            priority (set[int]): The concept indices that rank ahead of all others.
+            num_results (int): The number of results to return.
+
+        Returns:
+            float: The ratio cutoff, or 0.0 when every ratio is needed.
+        """
+        ranked_distances = [
+            distance
+            for distance in heapq.nsmallest(
+                num_results,
+                (
+                    distance
+                    for concept_idx, distance in enumerate(min_distances)
+                    if concept_idx not in priority
+                )
+                if priority
+                else min_distances,
+            )
+            if distance <= 1.0
+        ]
+        if len(ranked_distances) < num_results:
+            return 0.0
+
+        return max(0.0, (1.0 - ranked_distances[-1]) * 100.0 - 1e-6)
+
+    @classmethod
+    def _get_token_set_ratios(
+        cls,
+        search_term_stop: str,
+        label_rows: tuple[list[int], list[int], list[str], set[int]],
+        ratio_cutoff: float,
+    ) -> list[float]:
+        """Get the token set ratio of each distinct label, where labels below the cutoff are left at zero, except
+        for the labels that must be scored exactly.
+
+        Args:
+            search_term_stop (str): The stopworded search term.
+            label_rows (tuple[list[int], list[int], list[str], set[int]]): The scored label rows.
+            ratio_cutoff (float): The ratio below which labels are not scored.
+
+        Returns:
+            list[float]: The token set ratio of each distinct label.
+        """
+        _, _, unique_labels, rescore_labels = label_rows
+        label_ratios = [0.0] * len(unique_labels)
+
+        # each distinct label is scored once in one of two batched calls, where None choices are skipped
+        cls._score_labels(
+            search_term_stop,
+            {label_idx: unique_labels[label_idx] for label_idx in rescore_labels},
+            rapidfuzz.fuzz.token_set_ratio,
+            None,
+            label_ratios,
+        )
+        cls._score_labels(
+            search_term_stop,
+            [None if label_idx in rescore_labels else label for label_idx, label in enumerate(unique_labels)]
+            if rescore_labels
+            else unique_labels,
+            rapidfuzz.fuzz.token_set_ratio,
+            ratio_cutoff,
+            label_ratios,
+        )
+        return label_ratios
+
+    @staticmethod
+    def _score_labels(
+        search_term: str,
+        choices: Sequence[str | None] | dict[int, str],
+        scorer: Callable[..., float],
+        score_cutoff: float | None,
+        label_scores: list[float],
+    ) -> None:
+        """Score the labels in a batched call and store each score that passes the cutoff at its label position.
+
+        Args:
+            search_term (str): The stopworded search term.
+            choices (Sequence[str | None] | dict[int, str]): The labels to score by label position, where None
+                labels are skipped.
+            scorer (Callable[..., float]): The rapidfuzz scorer.
+            score_cutoff (float | None): The scorer cutoff, or None to score every label.
+            label_scores (list[float]): The scores to update in place.
+        """
+        for _, score, label_idx in rapidfuzz.process.extract_iter(
+            search_term, choices, scorer=scorer, score_cutoff=score_cutoff
+        ):
+            label_scores[label_idx] = score
+
+    @classmethod
+    def _get_damerau_levenshtein_distances(
+        cls,
+        search_term: str,
+        label_rows: tuple[list[int], list[int], list[str], set[int]],
+        num_concepts: int,
+        num_results: int,
+        priority: set[int],
+    ) -> list[float]:
+        """Get the normalized Damerau-Levenshtein distance from the search term to each distinct label, running
+        the slower metric only on the labels that can change the search results.
+
+        The normalized Levenshtein distance bounds the Damerau-Levenshtein distance from above, and half of it
+        bounds it from below, since a transposition costs at most two Levenshtein edits.  Labels with a
+        Levenshtein distance above the cutoff from _get_damerau_levenshtein_cutoffs get their lower bound, which
+        is still too far to reach the results.  The labels of the rescored priority matches are always computed
+        exactly, since those matches rank first whatever their distance.
+
+        Args:
+            search_term (str): The stopworded search term.
+            label_rows (tuple[list[int], list[int], list[str], set[int]]): The scored label rows.
+            num_concepts (int): The number of concepts in the index.
+            num_results (int): The number of results to return.
+            priority (set[int]): The concept indices that rank ahead of all others.
+
+        Returns:
+            list[float]: The distance, or a value worse than every distance that can reach the results, for
+            each distinct label.
+        """
+        _, _, unique_labels, rescore_labels = label_rows
+        levenshtein_distances = [
+            score
+            for _, score, _ in rapidfuzz.process.extract_iter(
+                search_term, unique_labels, scorer=Levenshtein.normalized_distance
+            )
+        ]
+        label_cutoff, score_cutoff = cls._get_damerau_levenshtein_cutoffs(
+            levenshtein_distances, label_rows, num_concepts, num_results, priority
+        )
+
+        # the remaining labels are scored with the cutoff so the scorer can stop early on the labels that are too
+        # far, which are left at the worst distance; the labels that must be exact are scored in full in a
+        # separate call
+        label_distances = [
+            1.0 if distance <= label_cutoff else distance / 2.0
+            for distance in levenshtein_distances
+        ]
+        cls._score_labels(
+            search_term,
+            {label_idx: unique_labels[label_idx] for label_idx in rescore_labels},
+            DamerauLevenshtein.normalized_distance,
+            None,
+            label_distances,
+        )
+        cls._score_labels(
+            search_term,
+            {
+                label_idx: unique_labels[label_idx]
+                for label_idx, distance in enumerate(levenshtein_distances)
+                if distance <= label_cutoff and label_idx not in rescore_labels
+            },
+            DamerauLevenshtein.normalized_distance,
+            score_cutoff,
+            label_distances,
+        )
+        return label_distances
+
+    @staticmethod
+    def _get_damerau_levenshtein_cutoffs(
+        levenshtein_distances: list[float],
+        label_rows: tuple[list[int], list[int], list[str], set[int]],
+        num_concepts: int,
+        num_results: int,
+        priority: set[int],
+    ) -> tuple[float, float | None]:
+        """Get the Levenshtein distance above which a label cannot reach the results, and the matching
+        Damerau-Levenshtein score cutoff.
+
+        Concepts outside the priority matches can only reach the results with a distance no worse than the k-th
+        best upper bound U among them, so labels with a Levenshtein distance above 2U can be skipped, and the
+        others only need to be scored up to U, padded since the scorer rounds the cutoff differently.
+
+        Args:
+            levenshtein_distances (list[float]): The normalized Levenshtein distance of each distinct label.
+            label_rows (tuple[list[int], list[int], list[str], set[int]]): The scored label rows.
+            num_concepts (int): The number of concepts in the index.
+            num_results (int): The number of results to return.
+            priority (set[int]): The concept indices that rank ahead of all others.
+
+        Returns:
+            tuple[float, float | None]: The Levenshtein distance cutoff and the score cutoff, or 2.0 and None
+            when every label is needed.
+        """
+        upper_bounds = [2.0] * num_concepts
+        for concept_idx, label_idx in zip(label_rows[0], label_rows[1]):
+            if concept_idx not in priority and levenshtein_distances[label_idx] < upper_bounds[concept_idx]:
+                upper_bounds[concept_idx] = levenshtein_distances[label_idx]
+
+        ranked_bounds = heapq.nsmallest(num_results, upper_bounds)
+        if len(ranked_bounds) < num_results or ranked_bounds[-1] >= 1.0:
+            return 2.0, None
+
+        return 2.0 * ranked_bounds[-1], ranked_bounds[-1] + 1e-6
+
+    def search_definitions(
+        self,
+        search_term: str,
+        sample_set: frozenset[int] | None,
+        num_results: int,
+    ) -> tuple[list[int], dict[int, float], set[int], set[int]]:
+        """Search the definitions of the index using partial token set ratios instead of simple string distance
+        functions.
+
+        Args:
+            search_term (str): The search term.
+            sample_set (frozenset[int] | None): The concept indices to search, or None for all concepts.
+            num_results (int): The number of results to return.
+
+        Returns:
+            tuple[list[int], dict[int, float], set[int], set[int]]: The top concept indices in order, the
+            distance for each sampled concept index, and the concept indices with an exact and with a substring
+            match.
+        """
+        samples = self._get_samples(sample_set)
+
+        # lowercase and stopword the search term once
+        search_term_lower = search_term.lower()
+        search_term_stop = stopword(search_term_lower)
+
+        exact, substring, substring_rows = self._find_definition_matches(search_term_lower, sample_set)
+
+        # definitions that share a token with the search term have a perfect partial token set ratio, so those
+        # concepts need no scoring, and when there are enough of them along with the substring matches, only
+        # the remaining substring rows need to be scored
+        max_ratios = self._get_token_matches(search_term_stop, sample_set)
+        candidate_concepts = substring | max_ratios.keys()
+        if len(candidate_concepts) >= num_results:
+            samples = [
+                concept_idx for concept_idx in samples if concept_idx in candidate_concepts
+            ]
+            rows: range | list[int] = sorted(
+                row for row in substring_rows if self._definition_concepts[row] not in max_ratios
+            )
+        else:
+            rows = self._get_definition_rows(sample_set, max_ratios)
+        self._score_definition_rows(search_term_stop, rows, max_ratios)
+
+        # concepts without definitions are as far as possible from the search term
+        distances: dict[int, float] = {
+            concept_idx: 1.0 - max_ratios[concept_idx] / 100.0
+            if concept_idx in max_ratios
+            else 1.0
+            for concept_idx in samples
+        }
+
+        # select the closest results without sorting every sample
+        top_samples = self._select_top_samples(
+            samples,
+            num_results,
+            distances,
+            substring,
+            lambda x: (-(x in exact), -(x in substring), distances[x]),
+        )
+        return top_samples, distances, exact, substring
+
+    def _find_definition_matches(
+        self, search_term_lower: str, sample_set: frozenset[int] | None
+    ) -> tuple[set[int], set[int], set[int]]:
+        """Find the definitions equal to or containing the lowercased search term in the joined definitions,
+        which are built once until the index changes.
+
+        Args:
+            search_term_lower (str): The lowercased search term.
+            sample_set (frozenset[int] | None): The concept indices to search, or None for all concepts.
+
+        Returns:
+            tuple[set[int], set[int], set[int]]: The concept indices with an exact match, the concept indices with
+            a substring match, and the definition rows with a substring match.
+        """
+        if self._definition_view is None:
+            self._definition_view = self._join_rows(self._definitions_lower)
+        joined_definitions, definition_offsets = self._definition_view
+
+        exact: set[int] = set()
+        substring: set[int] = set()
+        substring_rows: set[int] = set()
+        for row, _, is_exact in self._find_rows(
+            joined_definitions, definition_offsets, search_term_lower
+        ):
+            concept_idx = self._definition_concepts[row]
+            if sample_set is None or concept_idx in sample_set:
+                substring.add(concept_idx)
+                substring_rows.add(row)
+                if is_exact:
+                    exact.add(concept_idx)
+
+        return exact, substring, substring_rows
+
+    def _get_token_matches(
+        self, search_term_stop: str, sample_set: frozenset[int] | None
+    ) -> dict[int, float]:
+        """Find the concepts with a definition that shares a whitespace token with the stopworded search term,
+        which gives a perfect partial token set ratio, in the inverted token index.
+
+        Args:
+            search_term_stop (str): The stopworded search term.
+            sample_set (frozenset[int] | None): The concept indices to search, or None for all concepts.
+
+        Returns:
+            dict[int, float]: A ratio of 100.0 for each matching concept index.
+        """
+        max_ratios: dict[int, float] = {}
+        for token in set(search_term_stop.split()):
+            for row in self._definition_token_rows.get(token, []):
+                if sample_set is None or self._definition_concepts[row] in sample_set:
+                    max_ratios[self._definition_concepts[row]] = 100.0
+
+        return max_ratios
+
+    def _get_definition_rows(
+        self, sample_set: frozenset[int] | None, max_ratios: dict[int, float]
+    ) -> range | list[int]:
+        """Get the definition rows of the sampled concepts that still need scoring, as a range over every row
+        when nothing is filtered so that the full parallel lists can be scored directly.
+
+        Args:
+            sample_set (frozenset[int] | None): The concept indices to search, or None for all concepts.
+            max_ratios (dict[int, float]): The concept indices that are already scored.
+
+        Returns:
+            range | list[int]: The definition rows to score.
+        """
+        if sample_set is None and not max_ratios:
+            return range(len(self._definition_concepts))
+
+        return [
+            row
+            for row, concept_idx in enumerate(self._definition_concepts)
+            if (sample_set is None or concept_idx in sample_set)
+            and concept_idx not in max_ratios
+        ]
+
+    def _score_definition_rows(
+        self, search_term_stop: str, rows: range | list[int], max_ratios: dict[int, float]
+    ) -> None:
+        """Score definition rows in one batched call and store the best ratio of each concept that is not
+        already scored.
+
+        Args:
+            search_term_stop (str): The stopworded search term.
+            rows (range | list[int]): The definition rows to score, from _get_definition_rows.
+            max_ratios (dict[int, float]): The best ratio of each concept index, updated in place.
+        """
+        if isinstance(rows, range):
+            row_concepts = self._definition_concepts
+            row_definitions = self._definitions_stop
+        else:
+            row_concepts = [self._definition_concepts[row] for row in rows]
+            row_definitions = [self._definitions_stop[row] for row in rows]
+
+        # results are sorted best-first, so the first ratio seen for each concept is its best match
+        for _, score, row in rapidfuzz.process.extract(
+            search_term_stop,
+            row_definitions,
+            scorer=rapidfuzz.fuzz.partial_token_set_ratio,
+            limit=None,
+        ):
+            max_ratios.setdefault(row_concepts[row], score)
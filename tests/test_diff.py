@@ -0,0 +1,83 @@
+"""test_diff.py - tests for the diff module"""
+
+# imports
+import json
+
+# packages
+import pytest
+
+# project imports
+import lmss.owl
+from lmss.diff import diff_graphs, iter_graph_diffs
+from lmss.graph import LMSSGraph
+
+DIFF_OWL = """<?xml version="1.0"?>
+<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+         xmlns:rdfs="http://www.w3.org/2000/01/rdf-schema#"
+         xmlns:skos="http://www.w3.org/2004/02/skos/core#"
+         xmlns:owl="http://www.w3.org/2002/07/owl#">
+    <owl:Class rdf:about="http://lmss.sali.org/RDiffA">
+        <rdfs:label>Alpha</rdfs:label>
+        <skos:altLabel>First</skos:altLabel>
+        <skos:altLabel>Second</skos:altLabel>
+        <skos:hiddenLabel>ALPH</skos:hiddenLabel>
+        <skos:definition>The first concept.</skos:definition>
+    </owl:Class>
+    <owl:Class rdf:about="http://lmss.sali.org/RDiffB">
+        <rdfs:subClassOf rdf:resource="http://lmss.sali.org/RDiffA"/>
+        <rdfs:label>{label_b}</rdfs:label>
+    </owl:Class>
+</rdf:RDF>
+"""
+
+IRI_A = "http://lmss.sali.org/RDiffA"
+IRI_B = "http://lmss.sali.org/RDiffB"
+
+
+@pytest.fixture
+def diff_graph_pair(tmp_path, monkeypatch):
+    # keep the parsed graph cache out of the user cache directory
+    monkeypatch.setattr(lmss.owl, "OWL_CACHE_DIR", tmp_path / "cache")
+
+    # write two versions of a small ontology that only differ in the label of B
+    graphs = []
+    for name, label_b in (("g1", "Beta"), ("g2", "Beta Prime")):
+        owl_path = tmp_path / f"{name}.owl"
+        owl_path.write_text(DIFF_OWL.format(label_b=label_b))
+        graphs.append(LMSSGraph(owl_path=str(owl_path)))
+    return graphs
+
+
+def test_iter_graph_diffs_label_change(diff_graph_pair):
+    graph1, graph2 = diff_graph_pair
+    diffs = list(iter_graph_diffs(graph1, graph2))
+    assert diffs == [{"iri": IRI_B, "field": "label", "g1": "Beta", "g2": "Beta Prime", "diff_type": "field"}]
+
+
+def test_iter_graph_diffs_reordered_list(diff_graph_pair):
+    graph1, graph2 = diff_graph_pair
+
+    # reversing the order of a list field is not a difference
+    concept_a = graph2.concepts[IRI_A]
+    concept_a["alt_labels"] = list(reversed(concept_a["alt_labels"]))
+    assert concept_a["alt_labels"] != graph1.concepts[IRI_A]["alt_labels"]
+    assert [diff["iri"] for diff in iter_graph_diffs(graph1, graph2)] == [IRI_B]
+
+
+def test_iter_graph_diffs_missing_field(diff_graph_pair):
+    graph1, graph2 = diff_graph_pair
+
+    # a list field missing on one side matches an empty list on the other, but not a non-empty one
+    del graph1.concepts[IRI_B]["alt_labels"]
+    del graph2.concepts[IRI_A]["hidden_labels"]
+    diffs = [diff for diff in iter_graph_diffs(graph1, graph2) if diff["field"] != "label"]
+    assert diffs == [{"iri": IRI_A, "field": "hidden_labels", "g1": ["ALPH"], "g2": None, "diff_type": "field"}]
+
+
+def test_diff_graphs_json(diff_graph_pair, capsys):
+    graph1, graph2 = diff_graph_pair
+    diff_graphs(graph1, graph2, output_format="json")
+    output = capsys.readouterr().out
+    records = json.loads(output)
+    assert output == json.dumps(records, indent=4) + "\n"
+    assert [(record["iri"], record["field"]) for record in records] == [(IRI_B, "label")]
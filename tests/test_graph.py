@@ -1,7 +1,17 @@
 """test_graph.py - tests for the graph module"""
 
+# imports
+import itertools
+
+# packages
+import pytest
+import rapidfuzz
+import rdflib
+import rdflib.compare
+
 # project imports
-from lmss.graph import LMSSGraph
+import lmss.owl
+from lmss.graph import LABEL_DISTANCE_METRICS, LMSSGraph, stopword
 
 
 def test_load_graph():
@@ -17,6 +27,67 @@ def test_load_graph_cache():
     lmss_graph = LMSSGraph(use_cache=False)
 
 
+def test_load_graph_sidecar_cache():
+    # load twice so that the second load comes from the parsed graph cache
+    lmss_graph = LMSSGraph(use_cache=True)
+    cached_graph = LMSSGraph(use_cache=True)
+
+    # check that the store and concepts match
+    assert len(cached_graph) == len(lmss_graph)
+    assert sorted(cached_graph.namespaces()) == sorted(lmss_graph.namespaces())
+    assert cached_graph.concepts == lmss_graph.concepts
+    assert cached_graph.key_concept_subgraphs == lmss_graph.key_concept_subgraphs
+    assert cached_graph._hierarchy._descendant_table == lmss_graph._hierarchy.get_descendant_table()
+
+    # check that the key concepts share the restored concept IRI strings
+    for concept_iri in cached_graph.key_concepts.values():
+        if concept_iri in cached_graph.concepts:
+            assert cached_graph.concepts[concept_iri]["iri"] is concept_iri
+
+
+def test_load_graph_sidecar_cache_path(tmp_path, monkeypatch):
+    # write a small ontology and keep the parsed graph cache in a temporary directory
+    monkeypatch.setattr(lmss.owl, "OWL_CACHE_DIR", tmp_path / "cache")
+    owl_path = tmp_path / "cycle.owl"
+    owl_path.write_text(CYCLIC_OWL)
+
+    # the cache is named by its key and written without leaving temporary files behind
+    lmss_graph = LMSSGraph(owl_path=str(owl_path), use_cache=True)
+    cache_paths = list((tmp_path / "cache").iterdir())
+    assert len(cache_paths) == 1
+    assert cache_paths[0].name.endswith(".graph.pkl")
+
+    # the second load reads the cache instead of initializing the graph again
+    def fail_init_graph(self):
+        raise AssertionError("graph was not loaded from the cache")
+
+    monkeypatch.setattr(LMSSGraph, "_init_graph", fail_init_graph)
+    cached_graph = LMSSGraph(owl_path=str(owl_path), use_cache=True)
+    assert cached_graph.concepts == lmss_graph.concepts
+    assert list((tmp_path / "cache").iterdir()) == cache_paths
+
+
+def test_load_graph_cached_rdfxml_parser():
+    # parse without the sidecar cache and compare against rdflib's default RDF/XML parser
+    lmss_graph = LMSSGraph(use_cache=False)
+    owl_graph = lmss.owl.get_lmss_owl_rdflib(use_rdflib_parser=True)
+
+    assert rdflib.compare.isomorphic(lmss_graph, owl_graph)
+
+
+def test_stopword():
+    # stopwords are only removed between spaces
+    assert stopword("law of the sea") == "law sea"
+    assert stopword("admiralty and maritime law") == "admiralty maritime law"
+    assert stopword("land lawn") == "land lawn"
+
+    assert stopword("x and and y") == "x and y"
+
+    # each stopword is removed in its own pass, in order, so a later pass removes the stopwords an earlier one exposes
+    assert stopword("x a the y") == "x y"
+    assert stopword("x or and or y") == "x or y"
+
+
 def test_graph_key_concepts():
     # load the LMSS ontology from the local cache
     lmss_graph = LMSSGraph(owl_branch="develop")
@@ -57,6 +128,29 @@ def test_graph_search_labels():
     assert results[0]["label"] == "U.S. Postal Service"
     assert results[0]["distance"] == 0.0
 
+    # do the same with a single result, which is read from the exact label lookup
+    results = lmss_graph.search_labels("USPS", num_results=1)
+    assert len(results) == 1
+    assert results[0]["label"] == "U.S. Postal Service"
+    assert results[0]["exact"] and results[0]["starts_with"] and results[0]["substring"]
+
+    # do the same with a prefix, which is found in the sorted labels when the prefix matches fill the results
+    results = lmss_graph.search_labels("Admiralty and Mari", num_results=1)
+    assert results[0]["label"] == "Admiralty and Maritime Law"
+    assert results[0]["starts_with"] and results[0]["substring"] and not results[0]["exact"]
+
+    # labels are matched against their precomputed lowercase copies, so the case of the search term is ignored
+    results = lmss_graph.search_labels("ADMIRALTY AND MARITIME LAW")
+    assert results[0]["label"] == "Admiralty and Maritime Law"
+    assert results[0]["exact"] and results[0]["distance"] == 0.0
+    assert lmss_graph.concepts[results[0]["iri"]]["label_lower"] == "admiralty and maritime law"
+
+    # do the same with the faster edit distances
+    for distance_metric in ("osa", "levenshtein", "indel"):
+        results = lmss_graph.search_labels("Admiralty and Maritime Law", distance_metric=distance_metric)
+        assert results[0]["label"] == "Admiralty and Maritime Law"
+        assert results[0]["distance"] == 0.0
+
 
 def test_graph_search_definitions():
     # load the LMSS ontology from the local cache
@@ -66,6 +160,10 @@ def test_graph_search_definitions():
     results = lmss_graph.search_definitions("nautical")
     assert results[0]["label"] == "Admiralty and Maritime Law"
 
+    # check that the remaining results are ordered from closest to farthest
+    distances = [result["distance"] for result in results if not result["substring"]]
+    assert distances == sorted(distances)
+
     # do the same with area of law limited
     results = lmss_graph.search_definitions("nautical",
                                             concept_type=lmss_graph.key_concepts["Area of Law"])
@@ -78,6 +176,112 @@ def test_graph_search_definitions():
     assert results[0]["label"] != "Admiralty and Maritime Law"
 
 
+def test_graph_search_results_are_copies():
+    # load the LMSS ontology from the local cache
+    lmss_graph = LMSSGraph()
+
+    # a later search must not overwrite the scores of earlier results
+    results = lmss_graph.search_labels("Admiralty and Maritime Law")
+    lmss_graph.search_labels("Admiralty and Maritime Law",
+                             concept_type=lmss_graph.key_concepts["Area of Law"],
+                             concept_depth=1)
+    lmss_graph.search_definitions("Admiralty and Maritime Law")
+    assert results[0]["distance"] == 0.0
+    assert results[0]["exact"]
+
+    # the shared concept records are left without search fields
+    assert "distance" not in lmss_graph.concepts[results[0]["iri"]]
+
+
+
+# labels with transpositions and shared words, so the Damerau-Levenshtein and Levenshtein distances differ
+SEARCH_LABELS = [
+    ("Contract Law", ["Contracts"]),
+    ("Contarct Law", []),
+    ("Cnotract Law", ["Law of Contracts"]),
+    ("Tax Law", ["Taxation"]),
+    ("Tax Court", ["Tax Tribunal"]),
+    ("Taxation of Estates", []),
+    ("Maritime Law", ["Admiralty"]),
+    ("Admiralty and Maritime Law", ["Martime Law"]),
+    ("Law of the Sea", []),
+] + [
+    (f"{prefix} {noun}", [f"{noun} of the {prefix[::-1]}"])
+    for prefix, noun in itertools.product(
+        ("Federal", "Fedreal", "State", "Sttae", "Local"), ("Court", "Cuort", "Agency", "Agnecy", "Statute")
+    )
+]
+
+
+def get_search_owl() -> str:
+    """Build an ontology with one concept for each entry of SEARCH_LABELS."""
+    concepts = [
+        f"""    <owl:Class rdf:about="http://lmss.sali.org/RSearch{idx}">
+        <rdfs:label>{label}</rdfs:label>
+{"".join(f"        <skos:altLabel>{alt_label}</skos:altLabel>{chr(10)}" for alt_label in alt_labels)}    </owl:Class>
+"""
+        for idx, (label, alt_labels) in enumerate(SEARCH_LABELS)
+    ]
+    return f"""<?xml version="1.0"?>
+<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+         xmlns:rdfs="http://www.w3.org/2000/01/rdf-schema#"
+         xmlns:skos="http://www.w3.org/2004/02/skos/core#"
+         xmlns:owl="http://www.w3.org/2002/07/owl#">
+{"".join(concepts)}</rdf:RDF>
+"""
+
+
+def get_unpruned_search_results(lmss_graph: LMSSGraph, search_term: str, num_results: int, distance_metric: str):
+    """Rank every concept by scoring all of its labels with process.extract, without any cutoff or prefilter."""
+    search_term_lower = search_term.lower()
+    search_term_stop = stopword(search_term_lower)
+    ranked = []
+    for iri, concept in lmss_graph.concepts.items():
+        labels_lower = [concept["label"].lower()] + [
+            label.lower() for field in ("pref_labels", "alt_labels", "hidden_labels") for label in concept[field]
+        ]
+        labels_stop = [stopword(label) for label in labels_lower]
+        # the distance is the best label distance or one minus the worst token set ratio, whichever is lower
+        distance = min(
+            min(
+                score
+                for _, score, _ in rapidfuzz.process.extract(
+                    search_term_stop, labels_stop, scorer=LABEL_DISTANCE_METRICS[distance_metric], limit=None
+                )
+            ),
+            1.0
+            - min(
+                score
+                for _, score, _ in rapidfuzz.process.extract(
+                    search_term_stop, labels_stop, scorer=rapidfuzz.fuzz.token_set_ratio, limit=None
+                )
+            )
+            / 100.0,
+        )
+        exact = search_term_lower in labels_lower
+        starts_with = any(label.startswith(search_term_lower) for label in labels_lower)
+        substring = any(search_term_lower in label for label in labels_lower)
+        ranked.append(((-exact, -starts_with, -substring, 0.0 if exact else distance), iri))
+
+    # sorted is stable, so ties keep the ontology order like search_labels does
+    return [(iri, key[-1]) for key, iri in sorted(ranked, key=lambda item: item[0])[:num_results]]
+
+
+@pytest.mark.parametrize("distance_metric", sorted(LABEL_DISTANCE_METRICS))
+@pytest.mark.parametrize("num_results", [1, 3, 10, 50])
+def test_graph_search_labels_unpruned(tmp_path, distance_metric, num_results):
+    # write a small ontology with near-duplicate labels
+    owl_path = tmp_path / "search.owl"
+    owl_path.write_text(get_search_owl())
+    lmss_graph = LMSSGraph(owl_path=str(owl_path), use_cache=False)
+
+    # the prefilters and cutoffs in search_labels must not change the ranking or the distances
+    for search_term in ("contract law", "cnotract", "tax", "maritme law", "fedreal agnecy", "court", "law sea", "xyz"):
+        results = lmss_graph.search_labels(search_term, num_results=num_results, distance_metric=distance_metric)
+        expected = get_unpruned_search_results(lmss_graph, search_term, num_results, distance_metric)
+        assert [result["iri"] for result in results] == [iri for iri, _ in expected]
+        assert [result["distance"] for result in results] == pytest.approx([distance for _, distance in expected])
+
 def test_graph_convenience_lists():
     # test all of the get_... convenience methods
     lmss_graph = LMSSGraph(owl_branch="develop")
@@ -98,3 +302,82 @@ def test_graph_parents():
     assert lmss_graph.concepts[iri]["parents"] == [
         "http://lmss.sali.org/RSYBzf149Mi5KE0YtmpUmr"
       ]
+
+
+def test_graph_children_depth():
+    lmss_graph = LMSSGraph()
+
+    area_of_law = lmss_graph.key_concepts["Area of Law"]
+
+    # direct children match the concept record
+    assert lmss_graph.get_children(area_of_law, max_depth=1) == set(
+        lmss_graph.concepts[area_of_law]["children"]
+    )
+
+    # unlimited depth terminates and is a superset of the default depth
+    all_children = lmss_graph.get_children(area_of_law, max_depth=-1)
+    assert all_children >= lmss_graph.get_children(area_of_law)
+    assert area_of_law not in all_children
+
+
+CYCLIC_OWL = """<?xml version="1.0"?>
+<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+         xmlns:rdfs="http://www.w3.org/2000/01/rdf-schema#"
+         xmlns:owl="http://www.w3.org/2002/07/owl#">
+    <owl:Class rdf:about="http://lmss.sali.org/RCycleA">
+        <rdfs:subClassOf rdf:resource="http://lmss.sali.org/RCycleC"/>
+        <rdfs:label>Cycle A</rdfs:label>
+    </owl:Class>
+    <owl:Class rdf:about="http://lmss.sali.org/RCycleB">
+        <rdfs:subClassOf rdf:resource="http://lmss.sali.org/RCycleA"/>
+        <rdfs:label>Cycle B</rdfs:label>
+    </owl:Class>
+    <owl:Class rdf:about="http://lmss.sali.org/RCycleC">
+        <rdfs:subClassOf rdf:resource="http://lmss.sali.org/RCycleB"/>
+        <rdfs:label>Cycle C</rdfs:label>
+    </owl:Class>
+</rdf:RDF>
+"""
+
+
+def test_graph_children_cycle(tmp_path):
+    # write a small ontology whose subClassOf edges form a cycle
+    owl_path = tmp_path / "cycle.owl"
+    owl_path.write_text(CYCLIC_OWL)
+    lmss_graph = LMSSGraph(owl_path=str(owl_path), use_cache=False)
+
+    # each depth visits the cycle once and stops, without returning the starting concept
+    cycle_a = "http://lmss.sali.org/RCycleA"
+    cycle_b = "http://lmss.sali.org/RCycleB"
+    cycle_c = "http://lmss.sali.org/RCycleC"
+    assert lmss_graph.get_children(cycle_a, max_depth=1) == {cycle_b}
+    assert lmss_graph.get_children(cycle_a, max_depth=2) == {cycle_b, cycle_c}
+    assert lmss_graph.get_children(cycle_a) == {cycle_b, cycle_c}
+    assert lmss_graph.get_children(cycle_a, max_depth=-1) == {cycle_b, cycle_c}
+
+    # each call returns a new set, so changing a result doesn't change the memoized children
+    children = lmss_graph.get_children(cycle_a)
+    assert isinstance(children, set)
+    children.add(cycle_a)
+    assert lmss_graph.get_children(cycle_a) == {cycle_b, cycle_c}
+
+
+def test_graph_children_cache_invalidation():
+    lmss_graph = LMSSGraph()
+
+    area_of_law = lmss_graph.key_concepts["Area of Law"]
+
+    # populate the memoized traversals before changing the graph
+    lmss_graph.get_children(area_of_law)
+    lmss_graph.get_children(area_of_law, max_depth=1)
+
+    # new concepts show up in both traversals and the key concept list
+    new_iri = lmss_graph.add_concept("Test Area of Law", area_of_law)
+    assert new_iri in lmss_graph.get_children(area_of_law)
+    assert new_iri in lmss_graph.get_children(area_of_law, max_depth=1)
+    assert new_iri in lmss_graph.get_areas_of_law()
+
+    # reset IRIs replace the old IRI in the traversals
+    reset_iri = lmss_graph.reset_iri(new_iri)
+    assert reset_iri in lmss_graph.get_children(area_of_law)
+    assert new_iri not in lmss_graph.get_children(area_of_law)
@@ -0,0 +1,72 @@
+"""test_hierarchy.py - tests for the hierarchy module"""
+
+# imports
+import pickle
+import random
+
+# project imports
+from lmss.hierarchy import ConceptHierarchy, get_descendant_table
+
+
+def get_reachable(child_indices, node, max_depth=-1):
+    # plain breadth-first search over the child indices, including the starting node
+    reachable = {node}
+    frontier = [node]
+    depth = 0
+    while frontier and (max_depth == -1 or depth < max_depth):
+        frontier = [child for parent in frontier for child in child_indices[parent] if child not in reachable]
+        reachable.update(frontier)
+        depth += 1
+    return reachable
+
+
+def test_get_descendant_table_random():
+    # compare against a brute-force search on random graphs with cycles, self loops, and shared children
+    rng = random.Random(0)
+    for _ in range(200):
+        num_nodes = rng.randint(1, 30)
+        child_indices = [
+            rng.sample(range(num_nodes), rng.randint(0, min(3, num_nodes))) for _ in range(num_nodes)
+        ]
+        component, descendants, heights = get_descendant_table(child_indices)
+
+        for node in range(num_nodes):
+            reachable = get_reachable(child_indices, node)
+            assert descendants[component[node]] == reachable
+
+            # a search as deep as the component height reaches every descendant
+            assert get_reachable(child_indices, node, heights[component[node]]) == reachable
+
+            # concepts share a component exactly when they reach each other
+            for other in reachable:
+                assert (component[other] == component[node]) == (node in get_reachable(child_indices, other))
+
+
+def test_concept_hierarchy_get_children():
+    # a - b - c - d with a cycle from d back to b, and a parent outside the concepts
+    concept_iris = ["a", "b", "c", "d"]
+    iri_to_idx = {iri: idx for idx, iri in enumerate(concept_iris)}
+    edges = {"a": ["b"], "b": ["c"], "c": ["d"], "d": ["b"], "root": ["a"]}
+    hierarchy = ConceptHierarchy(concept_iris, iri_to_idx, edges)
+    hierarchy.build()
+
+    assert hierarchy.get_children("a", 1) == {"b"}
+    assert hierarchy.get_children("a", 2) == {"b", "c"}
+    assert hierarchy.get_children("a", -1) == {"b", "c", "d"}
+    assert hierarchy.get_children("b", -1) == {"c", "d"}
+    assert hierarchy.get_children("root", 1) == {"a"}
+    assert hierarchy.get_children("root", -1) == {"a", "b", "c", "d"}
+
+    # depths that reach every descendant share the unlimited closure
+    assert hierarchy.get_closure_depth("c", 16) == -1
+
+    # new concepts clear the memoized traversals
+    concept_iris.append("e")
+    iri_to_idx["e"] = 4
+    edges["d"].append("e")
+    hierarchy.add_concept("e", ["d"])
+    assert hierarchy.get_children("a", -1) == {"b", "c", "d", "e"}
+
+    # the memoized traversals are rebuilt after pickling
+    restored = pickle.loads(pickle.dumps(hierarchy))
+    assert restored.get_children("a", -1) == {"b", "c", "d", "e"}
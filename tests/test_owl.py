@@ -4,11 +4,16 @@
 # Copyright (c) 2023 273 Ventures, LLC
 
 # imports
+import json
+import sys
 from pathlib import Path
 
 # packages
+import httpx
 import lxml.etree
+import pytest
 import rdflib
+import rdflib.compare
 
 # projects
 import lmss.owl
@@ -40,6 +45,84 @@ def test_get_lmss_owl_version():
     assert "<rdf:RDF" in owl
 
 
+# test download as bytes
+def test_get_lmss_owl_bytes():
+    """Test that we can download the LMSS OWL data as raw bytes."""
+    # load it
+    owl = lmss.owl.get_lmss_owl_bytes()
+
+    # check that we have xml bytes
+    assert owl.startswith(b"<?xml")
+
+    # check for <Ontology> tag
+    assert b"<rdf:RDF" in owl
+
+
+# test that the download cache is revalidated with the ETag
+def test_get_lmss_owl_bytes_cache(tmp_path, monkeypatch):
+    """Test that a cached download is reused when the server answers 304 Not Modified."""
+    owl_data = b'<?xml version="1.0"?><rdf:RDF/>'
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request.headers.get("If-None-Match"))
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, content=owl_data, headers={"ETag": '"v1"'})
+
+    # serve from a mock transport into an empty cache directory
+    monkeypatch.setattr(lmss.owl, "OWL_CACHE_DIR", tmp_path)
+    monkeypatch.setattr(
+        lmss.owl, "_HTTP_CLIENT", httpx.Client(transport=httpx.MockTransport(handler))
+    )
+    lmss.owl._get_cached_owl_bytes.cache_clear()
+
+    # the first call downloads, repeated calls in-process don't make a request
+    assert lmss.owl.get_lmss_owl_bytes(branch="test") == owl_data
+    assert lmss.owl.get_lmss_owl_bytes(branch="test") == owl_data
+    assert requests == [None]
+
+    # a new process would revalidate the cached copy and read it from disk
+    lmss.owl._get_cached_owl_bytes.cache_clear()
+    assert lmss.owl.get_lmss_owl_bytes(branch="test") == owl_data
+    assert requests == [None, '"v1"']
+    lmss.owl._get_cached_owl_bytes.cache_clear()
+
+
+
+def test_get_lmss_owl_bytes_cache_fallback(tmp_path, monkeypatch):
+    """Test that the cached copy is returned when the server can't be reached or returns an error."""
+    owl_data = b'<?xml version="1.0"?><rdf:RDF/>'
+    responses = [httpx.Response(200, content=owl_data, headers={"ETag": '"v1"'})]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if not responses:
+            raise httpx.ConnectError("unreachable", request=request)
+        return responses.pop(0)
+
+    # serve from a mock transport into an empty cache directory
+    monkeypatch.setattr(lmss.owl, "OWL_CACHE_DIR", tmp_path)
+    monkeypatch.setattr(
+        lmss.owl, "_HTTP_CLIENT", httpx.Client(transport=httpx.MockTransport(handler))
+    )
+    lmss.owl.clear_owl_cache()
+
+    # the download leaves only the body and its validators in the cache directory
+    assert lmss.owl.get_lmss_owl_bytes(branch="test") == owl_data
+    assert sorted(path.suffix for path in tmp_path.iterdir()) == [".json", ".owl"]
+
+    # a connection failure and a server error both fall back to the cached copy
+    lmss.owl.clear_owl_cache()
+    assert lmss.owl.get_lmss_owl_bytes(branch="test") == owl_data
+    responses.append(httpx.Response(503))
+    lmss.owl.clear_owl_cache()
+    assert lmss.owl.get_lmss_owl_bytes(branch="test") == owl_data
+
+    # without a cached copy, the error is raised
+    with pytest.raises(httpx.ConnectError):
+        lmss.owl.get_lmss_owl_bytes(branch="other")
+    lmss.owl.clear_owl_cache()
+
 # test that it parses into an etree
 def test_get_lmss_owl_parse():
     """Test that we can parse the LMSS OWL data into an lxml.etree document."""
@@ -78,6 +161,11 @@ def test_get_lmss_owl_rdflib():
     # check
     assert len(graph) > 0
 
+    # check that it matches rdflib's own RDF/XML parser
+    assert rdflib.compare.isomorphic(
+        graph, lmss.owl.get_lmss_owl_rdflib(use_rdflib_parser=True)
+    )
+
 
 # test that we can get concepts
 def test_get_concepts():
@@ -106,6 +194,72 @@ def test_get_concepts():
     assert len(concepts) > 100
 
 
+# test that concepts are read from the class child elements
+def test_get_concepts_etree():
+    """Test that we can get concepts from an etree that is passed in."""
+    # parse a small document with repeated and nested elements
+    doc = lxml.etree.fromstring(
+        b"""<?xml version="1.0"?>
+<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+         xmlns:rdfs="http://www.w3.org/2000/01/rdf-schema#"
+         xmlns:owl="http://www.w3.org/2002/07/owl#"
+         xmlns:skos="http://www.w3.org/2004/02/skos/core#">
+    <owl:Class rdf:about="http://lmss.sali.org/RTestA">
+        <!-- comments are skipped -->
+        <rdfs:label>Test A</rdfs:label>
+        <rdfs:label>Test A Again</rdfs:label>
+        <skos:altLabel>Alt A</skos:altLabel>
+        <skos:hiddenLabel>TA</skos:hiddenLabel>
+        <skos:definition>A test concept.</skos:definition>
+        <rdfs:subClassOf rdf:resource="http://lmss.sali.org/RTestB"/>
+        <rdfs:subClassOf>
+            <owl:Class rdf:about="http://lmss.sali.org/RTestC"/>
+        </rdfs:subClassOf>
+        <rdfs:comment>First</rdfs:comment>
+        <rdfs:comment>Second</rdfs:comment>
+    </owl:Class>
+</rdf:RDF>"""
+    )
+
+    # get the concepts, including the nested class
+    concepts = lmss.owl.get_concepts(doc)
+    assert [concept["iri"] for concept in concepts] == [
+        "http://lmss.sali.org/RTestA",
+        "http://lmss.sali.org/RTestC",
+    ]
+
+    # check that the first label and definition are kept and the lists are in document order
+    assert concepts[0] == {
+        "iri": "http://lmss.sali.org/RTestA",
+        "label": "Test A",
+        "alt_labels": ["Alt A"],
+        "hidden_labels": ["TA"],
+        "subclass_list": ["http://lmss.sali.org/RTestB"],
+        "definition": "A test concept.",
+        "comments": ["First", "Second"],
+    }
+
+
+def test_get_concepts_interned_iris():
+    """Test that concept and subclass parent IRIs are shared strings."""
+    # parse a small document where one class is the parent of another
+    doc = lxml.etree.fromstring(
+        b"""<?xml version="1.0"?>
+<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+         xmlns:rdfs="http://www.w3.org/2000/01/rdf-schema#"
+         xmlns:owl="http://www.w3.org/2002/07/owl#">
+    <owl:Class rdf:about="http://lmss.sali.org/RTestParent"/>
+    <owl:Class rdf:about="http://lmss.sali.org/RTestChild">
+        <rdfs:subClassOf rdf:resource="http://lmss.sali.org/RTestParent"/>
+    </owl:Class>
+</rdf:RDF>"""
+    )
+
+    # the parent reference should be the same object as the parent IRI
+    parent, child = lmss.owl.get_concepts(doc)
+    assert child["subclass_list"][0] is parent["iri"]
+
+
 # test that we can export the list to CSV
 def test_export_concepts_csv():
     """Test that we can export the list of concepts to CSV."""
@@ -136,3 +290,23 @@ def test_export_concepts_json():
 
     # remove the file
     Path("test.json").unlink()
+
+
+# test JSON serialization
+def test_dumps_json(monkeypatch):
+    """Test that the JSON bytes are the same with or without orjson."""
+    data = [
+        {
+            "iri": "http://lmss.sali.org/RTest",
+            "label": "Société",
+            "parents": [],
+            "definition": None,
+        }
+    ]
+    json_data = lmss.owl.dumps_json(data)
+    assert json.loads(json_data) == data
+    assert "Société".encode("utf-8") in json_data
+
+    # hide orjson to use the standard library fallback
+    monkeypatch.setitem(sys.modules, "orjson", None)
+    assert lmss.owl.dumps_json(data) == json_data
@@ -0,0 +1,50 @@
+"""test_qa.py - tests for the qa module"""
+
+# packages
+import pytest
+
+# project imports
+import lmss.owl
+from lmss.qa import LMSSGraphQA
+
+EXTERNAL_PARENT_OWL = """<?xml version="1.0"?>
+<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+         xmlns:rdfs="http://www.w3.org/2000/01/rdf-schema#"
+         xmlns:owl="http://www.w3.org/2002/07/owl#">
+    <owl:Class rdf:about="http://lmss.sali.org/RCycleA">
+        <rdfs:label>Cycle A</rdfs:label>
+    </owl:Class>
+    <owl:Class rdf:about="http://example.org/CycleX">
+        <rdfs:subClassOf rdf:resource="http://lmss.sali.org/RCycleA"/>
+        <rdfs:label>Cycle X</rdfs:label>
+    </owl:Class>
+</rdf:RDF>
+"""
+
+
+@pytest.fixture
+def external_parent_qa(tmp_path, monkeypatch):
+    # keep the parsed graph cache out of the user cache directory
+    monkeypatch.setattr(lmss.owl, "OWL_CACHE_DIR", tmp_path / "cache")
+
+    # write a small ontology with a concept outside LMSS under an LMSS concept
+    owl_path = tmp_path / "external_parent.owl"
+    owl_path.write_text(EXTERNAL_PARENT_OWL)
+    return LMSSGraphQA(owl_path=str(owl_path))
+
+
+def test_check_loops_external_parent(external_parent_qa):
+    cycle_a = "http://lmss.sali.org/RCycleA"
+    cycle_x = "http://example.org/CycleX"
+
+    # record the subClassOf edges both ways round, as a concept map that keeps IRIs outside LMSS would, so the
+    # edge from the outside parent is only seen through the LMSS concept's parents
+    concept_a = external_parent_qa.graph.concepts[cycle_a]
+    concept_a["parents"] = [cycle_x]
+    concept_a["children"] = [cycle_x]
+
+    external_parent_qa.check_loops()
+    assert len(external_parent_qa.findings) == 1
+    finding = external_parent_qa.findings[0]
+    assert finding["source"] == "check_loops"
+    assert cycle_a in finding["description"] and cycle_x in finding["description"]
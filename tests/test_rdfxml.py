@@ -0,0 +1,50 @@
+"""test_rdfxml.py - tests for the rdfxml module"""
+
+# imports
+import io
+
+# packages
+import pytest
+import rdflib
+import rdflib.compare
+
+# project imports
+from lmss.rdfxml import CACHED_RDFXML_FORMAT, RDFXMLTreeReader, UnsupportedRDFXMLError
+
+RDFXML_DOCUMENT = """<?xml version="1.0"?>
+<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+         xmlns:rdfs="http://www.w3.org/2000/01/rdf-schema#"
+         xmlns:owl="http://www.w3.org/2002/07/owl#"
+         xml:base="http://lmss.sali.org/" xml:lang="en">
+    <owl:Class rdf:about="RTestA">
+        <rdfs:label>Test <!-- split --> A</rdfs:label>
+        <rdfs:comment xml:lang="fr">Essai</rdfs:comment>
+        <rdfs:subClassOf>
+            <owl:Restriction>
+                <owl:onProperty rdf:resource="http://lmss.sali.org/hasTest"/>
+                <owl:someValuesFrom rdf:nodeID="shared"/>
+            </owl:Restriction>
+        </rdfs:subClassOf>
+        <rdfs:seeAlso rdf:nodeID="shared"/>
+        {extra}
+    </owl:Class>
+    <rdf:Description rdf:nodeID="shared">
+        <rdfs:label rdf:datatype="http://www.w3.org/2001/XMLSchema#string">Shared</rdfs:label>
+    </rdf:Description>
+</rdf:RDF>
+"""
+
+
+@pytest.mark.parametrize("extra", ["", '<rdfs:comment rdf:parseType="Literal"><b>bold</b></rdfs:comment>'])
+def test_rdfxml_tree_reader(extra):
+    # parse with rdflib's default RDF/XML parser and with the lxml tree reader or its fallback
+    data = RDFXML_DOCUMENT.format(extra=extra).encode("utf-8")
+    rdflib_graph = rdflib.Graph().parse(data=data, format="xml")
+    lmss_graph = rdflib.Graph().parse(source=io.BytesIO(data), format=CACHED_RDFXML_FORMAT)
+
+    assert rdflib.compare.isomorphic(lmss_graph, rdflib_graph)
+
+    # parse types are left to rdflib's parser
+    if extra:
+        with pytest.raises(UnsupportedRDFXMLError):
+            RDFXMLTreeReader().read(data)